@@ -0,0 +1,60 @@
+"""Measures a URL-seen test over a stream of URLs with duplicates using
+canonical_hash() compared to keeping normalized hrefs in a set.
+
+    python benchmarks/bench_dedup.py [count]
+
+The count defaults to 10,000,000 URLs.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whatwg_url  # noqa: E402
+
+URL_FORMATS = [
+    "https://www.example.com/products/%d?utm_source=mail&id=%d#reviews",
+    "HTTPS://WWW.EXAMPLE.COM:443/products/%d?id=%d",
+    "http://blog.example.org/%d/posts/%d/",
+    "https://cdn.example.net/static/%d/app.js?v=%d",
+]
+
+
+def iter_urls(count):
+    for i in range(count):
+        # Roughly every other URL has been seen before.
+        n = i // 2
+        yield URL_FORMATS[n % len(URL_FORMATS)] % (n % 100003, n)
+
+
+def bench(name, count, key):
+    seen = set()
+    start = time.time()
+    for url in iter_urls(count):
+        seen.add(key(url))
+    seconds = time.time() - start
+    size = sys.getsizeof(seen) + sum(sys.getsizeof(x) for x in seen)
+    print(
+        "%-16s %10d unique %10.0f urls/s %8.1f MB seen"
+        % (name, len(seen), count / seconds, size / 1e6)
+    )
+
+
+def href_without_fragment(url):
+    url = whatwg_url.parse_url(url)
+    url.fragment = None
+    return url.href
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000000
+    bench("canonical_hash", count, whatwg_url.canonical_hash)
+    bench("href", count, href_without_fragment)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Measures host parsing for a list of popular hostnames.
+
+Compares UrlParser.parse_host(), with the host cache disabled, against
+running the same hostnames through IDNA processing which is what every
+special host used to go through.
+
+    python benchmarks/bench_hosts.py
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whatwg_url  # noqa: E402
+
+HOSTS = [
+    "google.com",
+    "youtube.com",
+    "facebook.com",
+    "baidu.com",
+    "wikipedia.org",
+    "qq.com",
+    "taobao.com",
+    "yahoo.com",
+    "tmall.com",
+    "amazon.com",
+    "twitter.com",
+    "sohu.com",
+    "instagram.com",
+    "vk.com",
+    "live.com",
+    "jd.com",
+    "sina.com.cn",
+    "weibo.com",
+    "reddit.com",
+    "login.tmall.com",
+    "360.cn",
+    "yandex.ru",
+    "linkedin.com",
+    "blogspot.com",
+    "netflix.com",
+    "twitch.tv",
+    "pages.tmall.com",
+    "mail.ru",
+    "csdn.net",
+    "alipay.com",
+    "microsoftonline.com",
+    "Office.com",
+    "ok.ru",
+    "microsoft.com",
+    "stackoverflow.com",
+    "WWW.Bing.com",
+    "imdb.com",
+    "github.com",
+    "en.m.wikipedia.org",
+    "s3.us-west-2.amazonaws.com",
+]
+HOSTS += ["www." + host for host in HOSTS]
+
+
+def bench(name, func):
+    number = 20
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print("%-24s %10.2f us/host" % (name, seconds * 1e6 / len(HOSTS)))
+
+
+def parse_hosts():
+    parser = whatwg_url.UrlParser()
+    for host in HOSTS:
+        parser.parse_host(host)
+
+
+def idna_hosts():
+    for host in HOSTS:
+        whatwg_url._domain_to_ascii(host).decode("utf-8").lower()
+
+
+def main():
+    whatwg_url.set_host_cache_size(0)
+    bench("UrlParser.parse_host()", parse_hosts)
+    bench("IDNA processing", idna_hosts)
+
+
+if __name__ == "__main__":
+    main()
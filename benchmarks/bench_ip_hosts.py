@@ -0,0 +1,72 @@
+"""Measures parsing of URLs with IPv4 and IPv6 address hosts.
+
+The host cache is disabled so that every URL runs the IP address
+parsers. IPv6 parsing is also compared against the ipaddress module.
+
+    python benchmarks/bench_ip_hosts.py
+"""
+
+from __future__ import print_function
+
+import functools
+import ipaddress
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whatwg_url  # noqa: E402
+
+URLS = [
+    "http://127.0.0.1/",
+    "http://192.168.0.1:8080/admin",
+    "http://10.0.0.255/",
+    "http://0x7f.1/",
+    "http://0300.0250.0.01/",
+    "http://3232235521/",
+    "http://[::1]/",
+    "http://[2001:db8::ff00:42:8329]:443/",
+    "http://[fe80:0:0:0:200:f8ff:fe21:67cf]/",
+    "http://[::ffff:192.0.2.128]/",
+    "http://[2001:0db8:0000:0000:0000:0000:0000:0001]/",
+]
+IPV6 = [url.split("[")[1].split("]")[0] for url in URLS if "[" in url]
+
+
+def bench(name, func, count):
+    number = 200
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print("%-28s %10.2f us/item" % (name, seconds * 1e6 / count))
+
+
+def parse_urls():
+    for url in URLS:
+        whatwg_url.parse_url(url)
+
+
+def parse_ipv6(parse):
+    for address in IPV6:
+        parse(address)
+
+
+def main():
+    whatwg_url.set_host_cache_size(0)
+    bench("parse_url()", parse_urls, len(URLS))
+    bench(
+        "IPv6 parse and serialize",
+        functools.partial(
+            parse_ipv6,
+            lambda x: whatwg_url._serialize_ipv6(whatwg_url._parse_ipv6(x)),
+        ),
+        len(IPV6),
+    )
+    bench(
+        "ipaddress.IPv6Address",
+        functools.partial(parse_ipv6, lambda x: str(ipaddress.IPv6Address(x))),
+        len(IPV6),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measures how UrlParser.parse() scales with the length of its input.
+
+Parsing should be linear in the length of the URL, so the time per
+byte reported for each input shape should stay roughly constant as
+the input grows from 10 B to 1 MB.
+
+    python benchmarks/bench_parse_scaling.py
+"""
+
+from __future__ import print_function
+
+import functools
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whatwg_url  # noqa: E402
+
+SIZES = [10, 100, 1000, 10000, 100000, 1000000]
+
+SHAPES = [
+    ("path", "http://example.com/", "a", ""),
+    ("segments", "http://example.com/", "a/", ""),
+    ("query", "http://example.com/?", "a=b&", ""),
+    ("fragment", "http://example.com/#", "f", ""),
+    ("data", "data:text/plain;base64,", "QUJD", ""),
+    ("userinfo", "http://", "u", "@example.com/"),
+    ("at-signs", "http://", "a@", "h/"),
+    ("ipv6", "http://[", "1:", "]"),
+]
+
+
+def make_input(prefix, unit, size):
+    body = unit * (max(size - len(prefix), 0) // len(unit) + 1)
+    return prefix + body[: max(size - len(prefix), 0)]
+
+
+def parse(data):
+    try:
+        whatwg_url.parse_url(data)
+    except whatwg_url.UrlParserError:
+        pass
+
+
+def main():
+    print("%-10s %10s %12s %12s" % ("shape", "bytes", "seconds", "ns/byte"))
+    for name, prefix, unit, suffix in SHAPES:
+        for size in SIZES:
+            data = make_input(prefix, unit, size) + suffix
+            number = max(1, 100000 // size)
+            timer = functools.partial(parse, data)
+            seconds = min(timeit.repeat(timer, number=number, repeat=3)) / number
+            print(
+                "%-10s %10d %12.6f %12.1f"
+                % (name, len(data), seconds, seconds * 1e9 / len(data))
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Measures the fixed per-call overhead of parsing a short URL.
+
+Compares creating a new UrlParser for every URL, as parse_url() does,
+against reusing a single parser.
+
+    python benchmarks/bench_parser_overhead.py
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whatwg_url  # noqa: E402
+
+URL = "https://a.b/"
+NUMBER = 20000
+
+
+def bench(name, func):
+    seconds = min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER
+    print("%-24s %10.2f us" % (name, seconds * 1e6))
+
+
+def main():
+    parser = whatwg_url.UrlParser()
+
+    bench("UrlParser()", whatwg_url.UrlParser)
+    bench("parse_url()", lambda: whatwg_url.parse_url(URL))
+    bench("reused UrlParser.parse()", lambda: parser.parse(URL))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Measures matching URLs against thousands of hostname rules with
+UrlPatternSet compared to trying every UrlPattern in turn.
+
+    python benchmarks/bench_patterns.py [rules] [count]
+
+The defaults are 5,000 rules and 20,000 URLs.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whatwg_url  # noqa: E402
+
+
+def make_patterns(rules):
+    patterns = []
+    for i in range(rules):
+        if i % 2:
+            patterns.append(whatwg_url.UrlPattern(hostname="*.site%d.com" % i))
+        else:
+            patterns.append(
+                whatwg_url.UrlPattern(
+                    scheme="https", hostname="site%d.com" % i, pathname="/:section/*"
+                )
+            )
+    return patterns
+
+
+def bench(name, urls, match):
+    start = time.time()
+    matched = 0
+    for url in urls:
+        matched += len(match(url))
+    seconds = time.time() - start
+    print("%-12s %10d matches %10.0f urls/s" % (name, matched, len(urls) / seconds))
+
+
+def main():
+    rules = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    patterns = make_patterns(rules)
+    pattern_set = whatwg_url.UrlPatternSet(patterns)
+    urls = [
+        whatwg_url.parse_url("https://www.site%d.com/news/%d" % (i % (rules * 2), i))
+        for i in range(count)
+    ]
+
+    bench("pattern set", urls, pattern_set.match)
+
+    def match_each(url):
+        return [pattern for pattern in patterns if pattern.test(url)]
+
+    bench("each", urls[: count // 100], match_each)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measures parsing of URLs dominated by their path, query and fragment
+such as the tracking and ad-tech URLs seen while crawling.
+
+    python benchmarks/bench_query_urls.py
+"""
+
+from __future__ import print_function
+
+import functools
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import whatwg_url  # noqa: E402
+
+URLS = [
+    (
+        "adtech",
+        "https://ad.doubleclick.net/ddm/trackclk/N1234.5678AB/B2345678.9;"
+        "dc_trk_aid=123456789;dc_trk_cid=98765432;dc_lat=;dc_rdid=;"
+        "tag_for_child_directed_treatment=;tfua=?utm_source=newsletter"
+        "&utm_medium=email&utm_campaign=spring_sale_2018&utm_term=shoes"
+        "&utm_content=hero_banner&gclid=EAIaIQobChMI7pLx2e3X3QIVzV8NCh0"
+        "&fbclid=IwAR2F4-dbP0l7Mn1eAKsbs3tdHcsqgYi3rI5oRQkFEVK8LuUQFXx8U"
+        "&redirect=https%3A%2F%2Fwww.example.com%2Fproducts%2Fshoes%3Fid%3D42",
+    ),
+    (
+        "search",
+        "https://www.google.com/search?q=whatwg+url+living+standard"
+        "&oq=whatwg+url&aqs=chrome.0.69i59j0l5.2207j0j7&sourceid=chrome"
+        "&ie=UTF-8",
+    ),
+    (
+        "path",
+        "https://github.com/SethMichaelLarson/whatwg-url/blob/master/"
+        "tests/test_web_platform_tests.py#L10-L25",
+    ),
+    (
+        "fragment",
+        "https://example.com/app/#/dashboard/reports/2018/08/summary"
+        "?view=weekly&filter=region:emea",
+    ),
+    ("short", "https://example.com/"),
+]
+
+
+def main():
+    print("%-10s %8s %12s" % ("url", "bytes", "us/parse"))
+    for name, url in URLS:
+        number = 2000
+        timer = functools.partial(whatwg_url.parse_url, url)
+        seconds = min(timeit.repeat(timer, number=number, repeat=5)) / number
+        print("%-10s %8d %12.2f" % (name, len(url), seconds * 1e6))
+
+
+if __name__ == "__main__":
+    main()
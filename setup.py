@@ -37,7 +37,7 @@ setup(
     url="https://github.com/SethMichaelLarson/whatwg-url",
     license="Apache-2.0",
     py_modules=["whatwg_url"],
-    install_requires=["idna", "six", "ipaddress"],
+    install_requires=["idna", "six"],
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -0,0 +1,92 @@
+import pytest
+import whatwg_url
+
+asyncio = pytest.importorskip("asyncio")
+futures = pytest.importorskip("concurrent.futures")
+
+
+def test_parse_urls_async_yields_to_event_loop():
+    loop = asyncio.new_event_loop()
+    try:
+        urls = ["/%d" % i for i in range(100)]
+        future = whatwg_url.parse_urls_async(
+            urls, base="http://www.google.com", slice_size=10, loop=loop
+        )
+        ticks = []
+        loop.call_soon(lambda: ticks.append(future.done()))
+        results = loop.run_until_complete(future)
+    finally:
+        loop.close()
+
+    assert ticks == [False]
+    assert [url.href for url in results] == [
+        "http://www.google.com/%d" % i for i in range(100)
+    ]
+
+
+@pytest.mark.parametrize(
+    "executor_type", [futures.ThreadPoolExecutor, futures.ProcessPoolExecutor]
+)
+def test_parse_urls_async_executor(executor_type):
+    loop = asyncio.new_event_loop()
+    try:
+        with executor_type(2) as executor:
+            future = whatwg_url.parse_urls_async(
+                ["http://a", "http://b", "http://a"],
+                slice_size=2,
+                frozen=True,
+                executor=executor,
+                loop=loop,
+            )
+            results = loop.run_until_complete(future)
+    finally:
+        loop.close()
+
+    assert [url.href for url in results] == ["http://a/", "http://b/", "http://a/"]
+    assert isinstance(results[2], whatwg_url.FrozenUrl)
+
+
+def test_parse_urls_async_errors():
+    loop = asyncio.new_event_loop()
+    try:
+        future = whatwg_url.parse_urls_async(
+            ["http://a", "http://exa mple.com"], loop=loop
+        )
+        with pytest.raises(whatwg_url.UrlParserError):
+            loop.run_until_complete(future)
+
+        future = whatwg_url.parse_urls_async(["http://a", None], loop=loop)
+        with pytest.raises(AttributeError):
+            loop.run_until_complete(future)
+
+        future = whatwg_url.parse_urls_async([], loop=loop)
+        assert loop.run_until_complete(future) == []
+
+        for slice_size in (0, -1):
+            with pytest.raises(ValueError):
+                whatwg_url.parse_urls_async(
+                    ["http://a"], slice_size=slice_size, loop=loop
+                )
+    finally:
+        loop.close()
+
+
+def test_parse_urls_async_running_loop():
+    loop = asyncio.new_event_loop()
+    try:
+        done = loop.create_future()
+
+        def start():
+            future = whatwg_url.parse_urls_async(["http://a"], slice_size=1)
+            future.add_done_callback(lambda future: done.set_result(future.result()))
+
+        loop.call_soon(start)
+        results = loop.run_until_complete(done)
+    finally:
+        loop.close()
+
+    assert [url.href for url in results] == ["http://a/"]
+
+    if hasattr(asyncio, "get_running_loop"):
+        with pytest.raises(RuntimeError):
+            whatwg_url.parse_urls_async(["http://a"])
@@ -0,0 +1,95 @@
+import os
+import subprocess
+import sys
+
+import pytest
+import whatwg_url
+
+
+def test_parse_urls():
+    urls = whatwg_url.parse_urls(
+        ["/a", "b?c", "/a", "https://www.example.com"], base="https://www.google.com/x/"
+    )
+
+    assert [url.href for url in urls] == [
+        "https://www.google.com/a",
+        "https://www.google.com/x/b?c",
+        "https://www.google.com/a",
+        "https://www.example.com/",
+    ]
+    assert urls[0] is not urls[2]
+    assert type(urls[2]) is whatwg_url.Url
+
+
+def test_parse_urls_frozen():
+    urls = whatwg_url.parse_urls(["http://a", "http://b", "http://a"], frozen=True)
+
+    assert urls[0] is urls[2]
+    assert isinstance(urls[1], whatwg_url.FrozenUrl)
+
+
+def test_parse_urls_binary():
+    data = b"http://a/\xc3\xa9"
+    urls = whatwg_url.parse_urls([memoryview(data), bytearray(data), memoryview(data)])
+
+    assert [url.href for url in urls] == ["http://a/%C3%A9"] * 3
+
+
+def test_parse_urls_errors():
+    urls = ["http://a", "http://exa mple.com", "http://b"]
+
+    with pytest.raises(whatwg_url.UrlParserError):
+        whatwg_url.parse_urls(urls)
+
+    results = whatwg_url.parse_urls(urls, errors="return")
+    assert isinstance(results[1], whatwg_url.UrlParserError)
+    assert [url.href for url in results[::2]] == ["http://a/", "http://b/"]
+
+    results = whatwg_url.parse_urls(urls, errors="skip")
+    assert [url.href for url in results] == ["http://a/", "http://b/"]
+
+    with pytest.raises(ValueError):
+        whatwg_url.parse_urls(urls, errors="ignore")
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_normalize_urls_parallel(ordered):
+    urls = ["/%d" % i for i in range(50)]
+    hrefs = whatwg_url.normalize_urls_parallel(
+        urls, workers=2, chunksize=7, base="http://www.google.com", ordered=ordered
+    )
+
+    expected = ["http://www.google.com/%d" % i for i in range(50)]
+    if ordered:
+        assert list(hrefs) == expected
+    else:
+        assert sorted(hrefs) == sorted(expected)
+
+
+def test_normalize_urls_parallel_errors():
+    urls = ["http://a", "http://exa mple.com", "http://b"]
+
+    with pytest.raises(whatwg_url.UrlParserError):
+        list(whatwg_url.normalize_urls_parallel(urls, workers=1))
+
+    results = list(whatwg_url.normalize_urls_parallel(urls, workers=1, errors="return"))
+    assert isinstance(results[1], whatwg_url.UrlParserError)
+    assert results[::2] == ["http://a/", "http://b/"]
+
+    results = whatwg_url.normalize_urls_parallel(urls, workers=1, errors="skip")
+    assert list(results) == ["http://a/", "http://b/"]
+
+    for kwargs in ({"workers": 0}, {"workers": -1}, {"chunksize": 0}):
+        with pytest.raises(ValueError):
+            whatwg_url.normalize_urls_parallel(urls, **kwargs)
+
+
+@pytest.mark.parametrize("module", ["argparse", "asyncio", "json", "multiprocessing"])
+def test_import_skips_unused_modules(module):
+    code = "import sys, whatwg_url; print(%r in sys.modules)" % module
+    output = subprocess.check_output(
+        [sys.executable, "-c", code],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+
+    assert output.strip() == b"False"
@@ -0,0 +1,71 @@
+import io
+import json
+
+import pytest
+import whatwg_url
+
+
+@pytest.fixture
+def urls_file(tmpdir):
+    path = tmpdir.join("urls.txt")
+    path.write("https://www.Google.com/a/../b\n//x\nhttp://exa mple.com\n")
+    return str(path)
+
+
+def test_cli_normalizes_files(urls_file, capsys):
+    assert whatwg_url.main(["--base", "http://www.example.com", urls_file]) == 1
+
+    out, err = capsys.readouterr()
+    assert out == "https://www.google.com/b\nhttp://x/\n"
+    assert "line 3" in err
+
+
+def test_cli_invalid_base(urls_file, capsys):
+    with pytest.raises(SystemExit):
+        whatwg_url.main(["--base", "not a url", urls_file])
+    assert "invalid --base URL" in capsys.readouterr()[1]
+
+    with pytest.raises(SystemExit):
+        whatwg_url.main(["--base", "not a url", "--workers", "2", urls_file])
+
+
+def test_cli_reads_stdin(monkeypatch, capsys):
+    stdin = io.TextIOWrapper(io.BytesIO(b"//x/?a b\n\thttp://a\n"))
+    monkeypatch.setattr("sys.stdin", stdin)
+
+    assert whatwg_url.main(["--errors", "skip", "--stats"]) == 0
+
+    out, err = capsys.readouterr()
+    assert out == "http://a/\n"
+    assert err.startswith("2 URLs, 1 failed")
+
+
+def test_cli_encoding(tmpdir, capsys):
+    path = tmpdir.join("urls.txt")
+    path.write_binary(b"http://a/\xe9\r\nhttp://b/\n")
+
+    assert whatwg_url.main(["--encoding", "latin-1", str(path)]) == 0
+    assert capsys.readouterr()[0] == "http://a/%C3%A9\nhttp://b/\n"
+
+    assert whatwg_url.main(["--errors", "return", str(path)]) == 0
+    assert capsys.readouterr()[0] == "\nhttp://b/\n"
+
+
+def test_cli_json(urls_file, capsys):
+    assert whatwg_url.main(["--json", "--errors", "return", urls_file]) == 0
+
+    lines = capsys.readouterr()[0].splitlines()
+    assert json.loads(lines[0])["hostname"] == "www.google.com"
+    assert json.loads(lines[0])["path"] == "/b"
+    assert "error" in json.loads(lines[1])
+    assert "error" in json.loads(lines[2])
+
+
+def test_cli_workers(urls_file, capsys):
+    args = ["--workers", "2", "--errors", "return", "--base", "http://y", urls_file]
+    assert whatwg_url.main(args) == 0
+
+    assert capsys.readouterr()[0] == "https://www.google.com/b\nhttp://x/\n\n"
+
+    with pytest.raises(SystemExit):
+        whatwg_url.main(["--workers", "-1", urls_file])
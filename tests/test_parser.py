@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+import threading
+
+import pytest
+import whatwg_url
+
+
+@pytest.fixture
+def parser_pooling():
+    whatwg_url._parser_pool.parsers = []
+    whatwg_url.set_parser_pooling(True)
+    try:
+        yield
+    finally:
+        whatwg_url.set_parser_pooling(False)
+
+
+def test_parser_reset_clears_state():
+    parser = whatwg_url.UrlParser()
+    parser.parse("http://user@[::1]:8080/a?b#c", base="http://example.com")
+    url = parser.url
+    parser.reset()
+
+    assert parser.url is not url
+    assert parser.url.scheme is None
+    assert parser.url._path == ()
+    assert parser.base is None
+    assert parser.state_override is None
+    assert parser.encoding is None
+    assert parser.validation_error is False
+    assert parser._buffer == ""
+    assert parser._at_flag is False
+    assert parser._square_brace_flag is False
+    assert parser._password_token_seen_flag is False
+
+
+def test_parser_pooling_reuses_parsers(parser_pooling):
+    whatwg_url.parse_url("https://www.google.com")
+    parser = whatwg_url._parser_pool.parsers[-1]
+    whatwg_url.parse_url("https://www.example.com")
+
+    assert whatwg_url._parser_pool.parsers == [parser]
+
+
+def test_parser_pooling_isolates_results(parser_pooling):
+    first = whatwg_url.parse_url("http://user:pass@[::1]:8080/a/b?c#d")
+    second = whatwg_url.parse_url("http://www.google.com")
+
+    assert first._path is not second._path
+    assert first.href == "http://user:pass@[::1]:8080/a/b?c#d"
+    assert second.href == "http://www.google.com/"
+
+    # A parse failure must not leak state into the next parse.
+    assert not whatwg_url.is_valid_url("http://a@[::1")
+    assert whatwg_url.normalize_url("http://[::2]:1/") == "http://[::2]:1/"
+
+
+def test_parser_pooling_per_thread(parser_pooling):
+    results = []
+
+    def target():
+        whatwg_url.parse_url("https://www.google.com")
+        results.append(whatwg_url._parser_pool.parsers[-1])
+
+    threads = [threading.Thread(target=target) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results[0] is not results[1]
+
+
+def test_base_cache_hits_and_misses():
+    whatwg_url.base_cache_clear()
+    base = "https://www.google.com/a/b"
+
+    assert whatwg_url.normalize_url("c", base=base) == "https://www.google.com/a/c"
+    assert whatwg_url.normalize_url("../d", base=base) == "https://www.google.com/d"
+    assert whatwg_url.normalize_url("e", base=base, encoding="latin-1") == (
+        "https://www.google.com/a/e"
+    )
+
+    info = whatwg_url.base_cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.currsize == 2
+
+
+def test_base_cache_protects_cached_base():
+    whatwg_url.base_cache_clear()
+    base = "file:///C:/a/b"
+
+    url = whatwg_url.parse_url("..", base=base)
+    url.path = "/C:/x/y"
+    url = whatwg_url.parse_url("?q", base=base)
+
+    assert url.href == "file:///C:/a/b?q"
+
+
+def test_base_cache_size():
+    whatwg_url.base_cache_clear()
+    try:
+        whatwg_url.set_base_cache_size(1)
+        whatwg_url.parse_url("/", base="https://a.com")
+        whatwg_url.parse_url("/", base="https://b.com")
+
+        assert whatwg_url.base_cache_info().currsize == 1
+
+        whatwg_url.set_base_cache_size(0)
+        whatwg_url.parse_url("/", base="https://c.com")
+
+        assert whatwg_url.base_cache_info().currsize == 0
+
+        with pytest.raises(ValueError):
+            whatwg_url.set_base_cache_size(-1)
+        with pytest.raises(ValueError):
+            whatwg_url.set_host_cache_size(-1)
+    finally:
+        whatwg_url.set_base_cache_size(256)
+
+
+def test_host_cache_hits_and_misses():
+    whatwg_url.host_cache_clear()
+
+    assert whatwg_url.parse_url("https://WWW.Google.com/a").hostname == (
+        "www.google.com"
+    )
+    assert whatwg_url.parse_url("https://WWW.Google.com/b").hostname == (
+        "www.google.com"
+    )
+    assert whatwg_url.parse_url("sc://WWW.Google.com/").hostname == "WWW.Google.com"
+
+    info = whatwg_url.host_cache_info()
+    assert info.hits == 1
+    assert info.misses == 2
+    assert info.currsize == 2
+
+
+def test_host_cache_failures_and_validation_errors():
+    whatwg_url.host_cache_clear()
+
+    for _ in range(2):
+        with pytest.raises(whatwg_url.UrlParserError):
+            whatwg_url.parse_url("http://a%00b/")
+
+        parser = whatwg_url.UrlParser()
+        parser.parse("http://1.2.3.4./")
+        assert parser.url.hostname == "1.2.3.4"
+        assert parser.validation_error is True
+
+    assert whatwg_url.host_cache_info().hits == 2
+
+
+def test_host_cache_disabled():
+    whatwg_url.host_cache_clear()
+    try:
+        whatwg_url.set_host_cache_size(0)
+        whatwg_url.parse_url("https://www.google.com")
+
+        assert whatwg_url.host_cache_info() == (0, 0, 0, 0)
+    finally:
+        whatwg_url.set_host_cache_size(4096)
+
+
+@pytest.mark.parametrize(
+    "host",
+    [
+        "www.google.com",
+        "WWW.Google.COM.",
+        "a-b.c-d",
+        "0x7f.1",
+        "1.2.3.4",
+        "ab--cd.com",
+        "xn--nxasmq6b.com",
+        "-a.com",
+        "a-.com",
+        "a..com",
+        "a" * 64 + ".com",
+        "under_score.com",
+    ],
+)
+def test_parse_host_ascii_fast_path_matches_idna(host):
+    parser = whatwg_url.UrlParser()
+    try:
+        expected = parser.parse_ipv4_host(
+            whatwg_url._domain_to_ascii(host).decode("utf-8").lower()
+        )
+    except (whatwg_url.UrlParserError, UnicodeError):
+        expected = None
+
+    try:
+        actual = parser._parse_host(host, False)
+    except whatwg_url.UrlParserError:
+        actual = None
+
+    assert actual == expected
+
+
+@pytest.mark.parametrize(
+    ["host", "expected"],
+    [
+        ("[::1]", "[::1]"),
+        ("[0:0:0:0:0:0:0:0]", "[::]"),
+        ("[1:0:0:2:0:0:0:3]", "[1:0:0:2::3]"),
+        ("[1:0:2:3:4:5:6:7]", "[1:0:2:3:4:5:6:7]"),
+        ("[2001:DB8::FF00:42:8329]", "[2001:db8::ff00:42:8329]"),
+        ("[::ffff:192.0.2.128]", "[::ffff:c000:280]"),
+        ("127.0.0.1", "127.0.0.1"),
+        ("0x7f.1", "127.0.0.1"),
+        ("0300.0250.0.01", "192.168.0.1"),
+        ("3232235521", "192.168.0.1"),
+        ("1.2.3.4.", "1.2.3.4"),
+        ("-1", "-1"),
+        ("+1", "+1"),
+        ("1.0x", "1.0.0.0"),
+        ("1.09", "1.09"),
+    ],
+)
+def test_parse_host_ip_addresses(host, expected):
+    assert whatwg_url.UrlParser()._parse_host(host, False) == expected
+
+
+@pytest.mark.parametrize(
+    "host",
+    [
+        "[::1%eth0]",
+        "[1:2:3:4:5:6:7:8:9]",
+        "[1::2::3]",
+        "[::1.2.3.04]",
+        "[::1.2.3]",
+        "[12345::]",
+        "[1:]",
+        "256.1.1.1",
+        "1.2.3.256.",
+        "4294967296",
+    ],
+)
+def test_parse_host_invalid_ip_addresses(host):
+    with pytest.raises(whatwg_url.UrlParserError):
+        whatwg_url.UrlParser()._parse_host(host, False)
+
+
+@pytest.mark.parametrize(
+    ["data", "expected"],
+    [
+        (b"", b""),
+        (b"www.example.com", b"www.example.com"),
+        (b"%E4%BD%A0%e5%a5%bd", u"你好".encode("utf-8")),
+        (b"%", b"%"),
+        (b"%4", b"%4"),
+        (b"%%41%", b"%A%"),
+        (b"%zz%2e", b"%zz."),
+    ],
+)
+def test_percent_decode(data, expected):
+    assert whatwg_url._percent_decode(data) == expected
+
+
+@pytest.mark.parametrize(
+    ["string", "encode_set", "expected"],
+    [
+        (u"", whatwg_url.PATH_PERCENT_ENCODE, u""),
+        (u"/a b?c", whatwg_url.PATH_PERCENT_ENCODE, u"/a%20b%3Fc"),
+        (u"a:b@c", whatwg_url.USERINFO_PERCENT_ENCODE, u"a%3Ab%40c"),
+        (u"a\x00\x7f", whatwg_url.C0_PERCENT_ENCODE, u"a%00%7F"),
+        (u"'#", whatwg_url.QUERY_PERCENT_ENCODE, u"'%23"),
+        (u"'#", whatwg_url.SPECIAL_QUERY_PERCENT_ENCODE, u"%27%23"),
+        (
+            u"你`\U0001f600",
+            whatwg_url.FRAGMENT_PERCENT_ENCODE,
+            u"%E4%BD%A0%60%F0%9F%98%80",
+        ),
+        (u"a-b_c", set(u"-_"), u"a%2Db%5Fc"),
+    ],
+)
+def test_percent_encode(string, encode_set, expected):
+    assert whatwg_url.percent_encode(string, encode_set) == expected
+    assert whatwg_url.percent_encode(string, encode_set) == "".join(
+        whatwg_url._percent_encode(c, encode_set) for c in string
+    )
+
+
+def test_percent_encode_bytes():
+    assert (
+        whatwg_url.percent_encode(b"/a b\xc3\xa9", whatwg_url.PATH_PERCENT_ENCODE)
+        == "/a%20b%C3%A9"
+    )
+    assert (
+        whatwg_url.percent_encode(memoryview(b"a b"), whatwg_url.PATH_PERCENT_ENCODE)
+        == "a%20b"
+    )
+
+    with pytest.raises(TypeError):
+        whatwg_url.percent_encode(12, whatwg_url.PATH_PERCENT_ENCODE)
+
+
+def test_percent_encode_modified_encode_set():
+    encode_set = whatwg_url.PATH_PERCENT_ENCODE
+    encode_set.add("a")
+    try:
+        assert whatwg_url.percent_encode(u"ab", encode_set) == "%61b"
+    finally:
+        encode_set.remove("a")
+
+
+@pytest.mark.parametrize(
+    ["data", "expected", "validation_error"],
+    [
+        (u"", u"", False),
+        (u"http://a/b", u"http://a/b", False),
+        (u"\x00 \x1fhttp://a/b \x01", u"http://a/b", True),
+        (u"ht\ttp://a\n/b\r", u"http://a/b", True),
+        (u" \t\n ", u"", True),
+        (u"http://a/ \x7f", u"http://a/ \x7f", False),
+        ("ht\ttp://a\n/b", "http://a/b", True),
+    ],
+)
+def test_preprocess_input(data, expected, validation_error):
+    assert whatwg_url._preprocess_input(data) == (expected, validation_error)
@@ -0,0 +1,118 @@
+import pytest
+import whatwg_url
+
+
+@pytest.mark.parametrize(
+    ["kwargs", "url", "matches"],
+    [
+        ({}, "https://example.com/", True),
+        ({"scheme": "http*"}, "https://example.com/", True),
+        ({"scheme": "http"}, "https://example.com/", False),
+        ({"hostname": "*.example.com"}, "https://a.b.example.com/", True),
+        ({"hostname": "*.example.com"}, "https://example.com/", False),
+        ({"hostname": "example.com"}, "https://EXAMPLE.com./", False),
+        ({"port": ""}, "https://example.com:443/", True),
+        ({"port": "8080"}, "https://example.com:8080/", True),
+        ({"pathname": "/a/:id"}, "https://example.com/a/b/c", False),
+        ({"pathname": "/a/*"}, "https://example.com/a/b/c", True),
+        ({"pathname": "/a\\*"}, "https://example.com/a*", True),
+        ({"search": "q=*"}, "https://example.com/?q=1", True),
+        ({"hash": ""}, "https://example.com/#x", False),
+    ],
+)
+def test_url_pattern_test(kwargs, url, matches):
+    pattern = whatwg_url.UrlPattern(**kwargs)
+
+    assert pattern.test(url) is matches
+    assert pattern.test(whatwg_url.parse_url(url)) is matches
+
+
+def test_url_pattern_match_groups():
+    pattern = whatwg_url.UrlPattern(
+        hostname=":sub.example.com", pathname="/products/:id/*"
+    )
+
+    result = pattern.match("https://shop.example.com/products/42/reviews?x=1")
+
+    assert result["hostname"] == {"sub": "shop"}
+    assert result["pathname"] == {"id": "42", "0": "reviews"}
+    assert result["search"] == {"0": "x=1"}
+    assert result["port"] == {"0": ""}
+    assert pattern.match("https://a.b.example.com/products/42/") is None
+
+
+def test_url_pattern_canonical_hostname():
+    pattern = whatwg_url.UrlPattern(scheme="HTTP*", hostname=":Sub.Example.COM")
+
+    assert pattern.scheme == "http*"
+    assert pattern.hostname == ":Sub.example.com"
+    assert pattern.match("https://www.example.com/")["hostname"] == {"Sub": "www"}
+
+    pattern_set = whatwg_url.UrlPatternSet(
+        [
+            whatwg_url.UrlPattern(hostname="Example.com"),
+            whatwg_url.UrlPattern(hostname=u"*.B\xfccher.de"),
+        ]
+    )
+
+    assert pattern_set.test("http://EXAMPLE.com/")
+    assert pattern_set.test(u"http://www.b\xfccher.de/")
+    assert not pattern_set.test(u"http://b\xfccher.de/")
+
+
+def test_url_pattern_non_special_hostname():
+    url = whatwg_url.parse_url("sc://Host/a")
+
+    assert url.hostname == "Host"
+    assert whatwg_url.UrlPattern(hostname="Host").test(url)
+    assert whatwg_url.UrlPattern(hostname="host").test(url)
+    assert whatwg_url.UrlPatternSet([whatwg_url.UrlPattern(hostname="Host")]).test(url)
+
+
+def test_url_pattern_invalid():
+    with pytest.raises(ValueError):
+        whatwg_url.UrlPattern(pathname="/:id/:id")
+
+
+def test_url_pattern_set():
+    patterns = [
+        whatwg_url.UrlPattern(hostname="*.example.com"),
+        whatwg_url.UrlPattern(pathname="/static/*"),
+        whatwg_url.UrlPattern(hostname="example.com", scheme="https"),
+        whatwg_url.UrlPattern(hostname="www.example.com", port="8080"),
+        whatwg_url.UrlPattern(hostname="*.example.org"),
+        whatwg_url.UrlPattern(hostname=""),
+    ]
+    pattern_set = whatwg_url.UrlPatternSet(patterns)
+
+    assert len(pattern_set) == 6
+    assert pattern_set.match("https://www.example.com:8080/static/a.js") == [
+        patterns[0],
+        patterns[1],
+        patterns[3],
+    ]
+    assert pattern_set.match("https://example.com/") == [patterns[2]]
+    assert pattern_set.match("http://example.com/") == []
+    assert pattern_set.match("file:///static/a") == [patterns[1], patterns[5]]
+    assert pattern_set.test("https://a.example.org/")
+    assert not pattern_set.test("https://example.net/")
+
+
+def test_url_pattern_set_matches_like_patterns():
+    patterns = [
+        whatwg_url.UrlPattern(hostname=hostname, pathname=pathname)
+        for hostname in ("*", "*.a.com", "a.com", "b.a.com", ":x.a.com", "*a.com")
+        for pathname in ("*", "/", "/p/:id")
+    ]
+    pattern_set = whatwg_url.UrlPatternSet(patterns)
+
+    for url in (
+        "http://a.com/",
+        "http://b.a.com/p/1",
+        "http://c.b.a.com/",
+        "http://ba.com/p/2",
+        "http://com/",
+        "mailto:a.com",
+    ):
+        url = whatwg_url.parse_url(url)
+        assert pattern_set.match(url) == [p for p in patterns if p.test(url)]
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import pytest
+import whatwg_url
+
+
+@pytest.mark.parametrize(
+    ["query", "pairs"],
+    [
+        ("", []),
+        ("?a=1", [("a", "1")]),
+        ("a=1&&b&=c&d=e=f", [("a", "1"), ("b", ""), ("", "c"), ("d", "e=f")]),
+        ("a+b=c+d%2B", [("a b", "c d+")]),
+        ("%E4%BD%A0=%zz&%FF=x", [(u"你", "%zz"), (u"\ufffd", "x")]),
+    ],
+)
+def test_search_params_parse(query, pairs):
+    assert list(whatwg_url.UrlSearchParams(query)) == pairs
+
+
+def test_search_params_serialize():
+    params = whatwg_url.UrlSearchParams([("a b", "c&d=e"), (u"é", "*-._~+")])
+
+    assert str(params) == "a+b=c%26d%3De&%C3%A9=*-._%7E%2B"
+    assert whatwg_url._serialize_form_urlencoded(b"a b~\xc3\xa9") == "a+b%7E%C3%A9"
+
+
+def test_search_params_non_text_values():
+    params = whatwg_url.UrlSearchParams({"n": 10})
+    params.append("page", 3)
+
+    assert str(params) == "n=10&page=3"
+
+
+def test_search_params_methods():
+    params = whatwg_url.UrlSearchParams("a=1&b=2&a=3")
+
+    assert params.get("a") == "1"
+    assert params.get("c") is None
+    assert params.get_all("a") == ["1", "3"]
+    assert params.has("b") and "b" in params and "c" not in params
+
+    params.set("a", "4")
+    assert str(params) == "a=4&b=2"
+
+    params.extend([("c", "5"), ("d", "6")])
+    params.delete("b", "d")
+    assert str(params) == "a=4&c=5"
+    assert len(params) == 2
+
+
+def test_search_params_sort_utf16():
+    params = whatwg_url.UrlSearchParams(
+        [(u"\uffff", "1"), (u"\U0001f600", "2"), ("b", "3"), ("a", "4"), ("b", "5")]
+    )
+    params.sort()
+
+    assert [value for _, value in params] == ["4", "3", "5", "2", "1"]
+
+
+def test_url_search_params_updates_query():
+    url = whatwg_url.parse_url("https://www.google.com/?utm_source=x&q=a%20b#f")
+    params = url.search_params
+
+    assert url.search_params is params
+
+    params.delete("utm_medium")
+    assert url.query == "utm_source=x&q=a%20b"
+
+    params.delete("utm_source")
+    assert url.href == "https://www.google.com/?q=a+b#f"
+
+    params.delete("q")
+    assert url.query is None
+    assert url.href == "https://www.google.com/#f"
+
+
+def test_url_search_params_follows_query():
+    url = whatwg_url.parse_url("https://www.google.com/?a=1")
+    params = url.search_params
+    url.query = "b=2"
+
+    assert url.search_params is not params
+    assert list(url.search_params) == [("b", "2")]
+
+    frozen = url.freeze()
+    frozen.search_params.append("c", "3")
+
+    assert frozen.query == "b=2"
+
+
+def test_url_search_params_held_after_query_changes():
+    url = whatwg_url.parse_url("http://a/?q=2&utm=1")
+    params = url.search_params
+    url.query = "x=1&utm=3"
+
+    assert params.get("x") == "1"
+    assert "utm" in params and "q" not in params
+    assert len(params) == 2
+    assert list(params) == [("x", "1"), ("utm", "3")]
+    assert str(params) == "x=1&utm=3"
+
+    params.delete("utm")
+
+    assert url.href == "http://a/?x=1"
+    assert list(params) == [("x", "1")]
+
+
+@pytest.mark.parametrize(
+    ["url", "expected"],
+    [
+        (
+            "https://www.google.com/?utm_source=a&q=1&fbclid=b&utm%5Fmedium=c#d",
+            "https://www.google.com/?q=1#d",
+        ),
+        (
+            "https://www.google.com/?b=2&a=%20&b=1&&c",
+            "https://www.google.com/?a=%20&b=2&b=1&c",
+        ),
+        ("https://www.google.com/?utm_source=a#d", "https://www.google.com/#d"),
+        ("https://www.google.com/?", "https://www.google.com/?"),
+        ("https://www.google.com/?&&", "https://www.google.com/?&&"),
+    ],
+)
+def test_query_filter(url, expected):
+    query_filter = whatwg_url.QueryFilter(deny=["utm_*", "fbclid", "gclid"], sort=True)
+
+    assert whatwg_url.normalize_url(url, query_filter=query_filter) == expected
+    assert whatwg_url.parse_url(url, lazy=True, query_filter=query_filter).href == (
+        expected
+    )
+
+
+@pytest.mark.parametrize(
+    ["url", "base", "expected"],
+    [
+        ("#x", "http://a/?utm_a=1&b=2", "http://a/?b=2#x"),
+        ("", "http://a/?utm_a=1&b=2#y", "http://a/?b=2"),
+        ("?utm_a=1&c=3", "http://a/?b=2", "http://a/?c=3"),
+        ("//b/", "http://a/?b=2", "http://b/"),
+        ("#x", "file:///p?utm_a=1&b=2", "file:///p?b=2#x"),
+        ("#x", "mailto:p?utm_a=1", "mailto:p#x"),
+    ],
+)
+def test_query_filter_relative(url, base, expected):
+    query_filter = whatwg_url.QueryFilter(deny="utm_*")
+
+    assert whatwg_url.normalize_url(url, base, query_filter=query_filter) == expected
+    assert (
+        whatwg_url.parse_url(url, base, lazy=True, query_filter=query_filter).href
+        == expected
+    )
+
+
+def test_query_filter_allow():
+    query_filter = whatwg_url.QueryFilter(allow=["q", "page"], deny="page")
+    url = whatwg_url.parse_url(
+        "https://www.google.com/search?page=2&q=a+b&qq=c", query_filter=query_filter
+    )
+
+    assert url.query == "q=a+b"
+
+
+@pytest.mark.parametrize(
+    ["query", "expected"],
+    [
+        ("", ""),
+        ("&", "&"),
+        ("a=1&&b", "a=1&&b"),
+        ("a=1&&utm_b=2&", "a=1"),
+        ("&utm_b=2", None),
+    ],
+)
+def test_query_filter_unchanged(query, expected):
+    assert whatwg_url.QueryFilter(deny="utm_*").filter(query) == expected
+
+
+def test_query_filter_empty_lists():
+    url = "http://x/?a=1&utm_b=2"
+
+    query_filter = whatwg_url.QueryFilter(deny=[])
+    assert whatwg_url.normalize_url(url, query_filter=query_filter) == url
+
+    query_filter = whatwg_url.QueryFilter(allow=[])
+    assert whatwg_url.normalize_url(url, query_filter=query_filter) == "http://x/"
@@ -1,3 +1,7 @@
+# -*- coding: utf-8 -*-
+import pickle
+
+import pytest
 import whatwg_url
 
 
@@ -121,3 +125,286 @@ def test_url_blob_origin():
     url = whatwg_url.parse_url("blob:https://www.google.com")
 
     assert url.origin == whatwg_url.parse_url("https://www.google.com").origin
+
+
+def test_url_long_input():
+    path = "/" + "a" * 100000
+    query = "b=" + "c" * 100000
+    url = whatwg_url.parse_url("https://www.google.com" + path + "?" + query + "#d")
+
+    assert url.path == path
+    assert url.query == query
+    assert url.fragment == "d"
+
+
+def test_url_long_userinfo():
+    url = whatwg_url.parse_url("http://" + "a@" * 1000 + "b:c@" * 1000 + "h/")
+
+    assert url.username == "a" + "%40a" * 999 + "%40b"
+    assert url.password == "c" + "%40b%3Ac" * 999
+    assert url.hostname == "h"
+
+
+def test_url_percent_encoding_mixed_with_safe_runs():
+    url = whatwg_url.parse_url(
+        "https://www.google.com/a b/%41%zz/é?q=a b&'x'=%2f\"#f g`%"
+    )
+
+    assert url.path == "/a%20b/%41%zz/%C3%A9"
+    assert url.query == "q=a%20b&%27x%27=%2f%22"
+    assert url.fragment == "f%20g%60%"
+
+
+def test_url_parser_reuse():
+    parser = whatwg_url.UrlParser()
+    first = parser.parse("https://user@www.google.com/a/b?c#d")
+    second = parser.parse("https://www.example.com:8080/")
+
+    assert first is not second
+    assert parser.url is second
+    assert first.href == "https://user@www.google.com/a/b?c#d"
+    assert second.href == "https://www.example.com:8080/"
+
+
+def test_url_compact_path():
+    url = whatwg_url.parse_url("https://www.google.com/a/b")
+
+    assert not hasattr(url, "__dict__")
+    assert url._path == ("a", "b")
+
+    url.path = "/c/../d/e"
+
+    assert url._path == ("d", "e")
+    assert url.href == "https://www.google.com/d/e"
+
+    with pytest.raises(whatwg_url.UrlParserError):
+        url.scheme = "1"
+
+    assert url._path == ("d", "e")
+
+
+@pytest.mark.parametrize("protocol", range(pickle.HIGHEST_PROTOCOL + 1))
+def test_url_pickle(protocol):
+    url = whatwg_url.parse_url("https://user@www.google.com:8080/a/b?c#d")
+    url.search_params.append("e", "f")
+    copy = pickle.loads(pickle.dumps(url, protocol))
+
+    assert type(copy) is whatwg_url.Url
+    assert copy.href == "https://user@www.google.com:8080/a/b?c=&e=f#d"
+    assert copy._path == ("a", "b")
+    assert copy.search_params.get("e") == "f"
+
+    frozen = pickle.loads(pickle.dumps(url.freeze(), protocol))
+
+    assert type(frozen) is whatwg_url.FrozenUrl
+    assert frozen == url.freeze()
+    assert frozen.href == url.href
+
+
+@pytest.mark.parametrize("protocol", range(pickle.HIGHEST_PROTOCOL + 1))
+def test_url_lazy_pickle(protocol):
+    url = whatwg_url.parse_url("https://www.google.com/a/./b?c#d", lazy=True)
+    copy = pickle.loads(pickle.dumps(url, protocol))
+
+    assert isinstance(copy, whatwg_url.Url)
+    assert copy.href == "https://www.google.com/a/b?c#d"
+    assert copy._path == ("a", "b")
+
+
+def test_url_freeze():
+    url = whatwg_url.parse_url("https://www.google.com/a?b#c")
+    frozen = url.freeze()
+
+    assert isinstance(frozen, whatwg_url.FrozenUrl)
+    assert frozen.href == url.href
+    assert frozen.path == "/a"
+    assert frozen.freeze() is frozen
+
+    url.path = "/d"
+
+    assert frozen.href == "https://www.google.com/a?b#c"
+
+    with pytest.raises(AttributeError):
+        frozen.path = "/d"
+    with pytest.raises(AttributeError):
+        frozen._query = "e"
+
+
+def test_url_frozen_equality_and_hash():
+    first = whatwg_url.parse_url("HTTPS://www.Google.com:443/a/../b", frozen=True)
+    second = whatwg_url.parse_url("https://www.google.com/b", frozen=True)
+    third = whatwg_url.parse_url("https://www.google.com/c", frozen=True)
+
+    assert first == second
+    assert first != third
+    assert len({first, second, third}) == 2
+    assert {first: 1}[second] == 1
+
+
+def test_url_thaw():
+    frozen = whatwg_url.FrozenUrl(scheme="https", hostname="www.google.com")
+    url = frozen.thaw()
+    url.path = "/a"
+
+    assert type(url) is whatwg_url.Url
+    assert url.href == "https://www.google.com/a"
+    assert frozen.href == "https://www.google.com"
+
+
+def test_url_lazy():
+    url = whatwg_url.parse_url("https://www.Google.com:8080/a/../b?c d#e", lazy=True)
+
+    assert url.hostname == "www.google.com"
+    assert url.port == 8080
+    assert url._tail == "/a/../b?c d#e"
+    assert url.query == "c%20d"
+    assert url._tail is None
+    assert url.href == "https://www.google.com:8080/b?c%20d#e"
+
+
+def test_url_lazy_read_while_materializing(monkeypatch):
+    url = whatwg_url.parse_url("https://www.google.com/a/b?c#d", lazy=True)
+    hrefs = []
+    run = whatwg_url.UrlParser._run
+
+    def run_and_read(parser):
+        # Another thread reading the URL while its tail is being parsed.
+        if not hrefs:
+            hrefs.append(None)
+            hrefs[0] = url.href
+        return run(parser)
+
+    monkeypatch.setattr(whatwg_url.UrlParser, "_run", run_and_read)
+
+    assert url.path == "/a/b"
+    assert hrefs == ["https://www.google.com/a/b?c#d"]
+    assert url.href == "https://www.google.com/a/b?c#d"
+
+
+def test_url_lazy_materialized_by_another_thread():
+    url = whatwg_url.parse_url("http://h/a/b?c", lazy=True)
+    # Another thread published the path but hasn't cleared the tail yet.
+    whatwg_url._URL_PATH_SLOT.__set__(url, ("a", "b"))
+
+    assert url.href == "http://h/a/b?c"
+
+
+def test_url_lazy_setters():
+    url = whatwg_url.parse_url("https://www.google.com/a?b#c", lazy=True)
+    url.path = "/d"
+
+    assert url.href == "https://www.google.com/d?b#c"
+
+    url = whatwg_url.parse_url("https://www.google.com/a?b#c", lazy=True)
+    url.fragment = None
+
+    assert url.href == "https://www.google.com/a?b"
+    assert url.freeze() == whatwg_url.parse_url(url.href, frozen=True)
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://www.google.com:443/a/../b?c#d",
+        "http://user:pass@[::1]:8080",
+        "blob:https://www.google.com/a",
+        "file:///C:/a",
+        "sc://host/a",
+        "about:blank",
+    ],
+)
+def test_parse_origin_and_host_only(url):
+    parsed = whatwg_url.parse_url(url)
+
+    # Opaque origins never compare equal so compare them as tuples.
+    assert tuple(whatwg_url.parse_origin(url)) == tuple(parsed.origin)
+    assert whatwg_url.parse_host_only(url) == parsed.hostname
+
+
+def test_parse_origin_relative():
+    assert whatwg_url.parse_origin("//www.google.com:8080/a", base="http://x") == (
+        "http",
+        "www.google.com",
+        8080,
+        None,
+    )
+
+    with pytest.raises(whatwg_url.UrlParserError):
+        whatwg_url.parse_host_only("http://exa mple.com/")
+
+
+PY2_BYTES = pytest.mark.skipif(bytes is str, reason="bytes is str on Python 2")
+
+
+@pytest.mark.parametrize(
+    "type_", [pytest.param(bytes, marks=PY2_BYTES), bytearray, memoryview]
+)
+def test_url_bytes_input(type_):
+    url = whatwg_url.parse_url(
+        type_(b"\t https://www.google.com/\xc3\xa9?q=\xc3\xa9 \n"), base=b"http://x"
+    )
+
+    assert url.href == whatwg_url.normalize_url(u"https://www.google.com/é?q=é")
+
+    url = whatwg_url.parse_url(
+        type_(b"/\xe9?\xe9"), base="http://x", encoding="latin-1"
+    )
+
+    assert url.href == "http://x/%C3%A9?%E9"
+
+    url = whatwg_url.parse_url("/a", base=type_(b"http://x/\xc3\xa9"))
+
+    assert url.href == "http://x/a"
+
+
+@pytest.mark.parametrize(
+    "type_", [pytest.param(bytes, marks=PY2_BYTES), bytearray, memoryview]
+)
+def test_url_bytes_input_decode_error(type_):
+    with pytest.raises(whatwg_url.UrlParserError):
+        whatwg_url.parse_url(type_(b"https://www.google.com/\xff"))
+
+
+def test_url_setter_fast_paths():
+    url = whatwg_url.parse_url("https://www.google.com:8443/a?b#c")
+    url.port = 443
+    url.hostname = "WWW.Example.COM"
+    url.path = "/d//e/"
+    url.query = "?f=1&g=/?"
+    url.fragment = "#h"
+
+    assert url.href == "https://www.example.com/d//e/?f=1&g=/?#h"
+
+    url.port = 8080
+    url.path = "/x/./y/../z"
+    url.query = "'a b'"
+    url.fragment = "<i>"
+
+    assert url.href == "https://www.example.com:8080/x/z?%27a%20b%27#%3Ci%3E"
+
+    url = whatwg_url.parse_url("sc://Host/a")
+    url.hostname = "Other"
+    url.query = "'"
+
+    assert url.href == "sc://Other/a?'"
+
+
+def test_url_canonical_key():
+    url = whatwg_url.parse_url("HTTPS://user@WWW.Google.com:443/A/b?z=1&a=2#c")
+    key = url.canonical_key()
+
+    assert key == 0x304F10AFFFACC3F7
+    assert url.canonical_key(bits=128) == 0x304F10AFFFACC3F73F0E0BD83EAF8136
+    assert key == whatwg_url.canonical_hash("https://user@www.google.com/A/b?z=1&a=2")
+    assert key != whatwg_url.canonical_hash("https://www.google.com/A/b?z=1&a=2")
+    assert key != url.canonical_key(lowercase_path=True)
+    assert url.canonical_key(lowercase_path=True, sort_query=True) == (
+        whatwg_url.canonical_hash(
+            "https://user@www.google.com/a/B?a=2&z=1",
+            lowercase_path=True,
+            sort_query=True,
+        )
+    )
+
+    with pytest.raises(ValueError):
+        url.canonical_key(bits=32)
@@ -1,9 +1,17 @@
 """Python implementation of the WHATWG URL Living Standard"""
 
+import binascii
+import fnmatch
+import functools
+import hashlib
+import io
 import string
 import re
-import ipaddress
+import sys
+import time
 import collections
+import itertools
+import threading
 import encodings.idna as idna2003
 import idna
 import six
@@ -11,10 +19,29 @@ import six
 
 __all__ = [
     "parse_url",
+    "parse_origin",
+    "parse_host_only",
     "normalize_url",
     "is_valid_url",
+    "parse_urls",
+    "canonical_hash",
+    "parse_urls_async",
+    "normalize_urls_parallel",
+    "percent_encode",
+    "set_parser_pooling",
+    "base_cache_info",
+    "base_cache_clear",
+    "set_base_cache_size",
+    "host_cache_info",
+    "host_cache_clear",
+    "set_host_cache_size",
     "UrlParser",
     "Url",
+    "UrlSearchParams",
+    "QueryFilter",
+    "UrlPattern",
+    "UrlPatternSet",
+    "FrozenUrl",
     "UrlParserError",
     "urlparse",
     "urljoin",
@@ -24,7 +51,9 @@ __version__ = "2018.8.26"
 __license__ = "Apache-2.0"
 
 
-def parse_url(url, base=None, encoding="utf-8"):
+def parse_url(
+    url, base=None, encoding="utf-8", frozen=False, lazy=False, query_filter=None
+):
     """
     Parses a URL from a string input with an optional base URL.
     If the input URL is a relative URL then it will be parsed as
@@ -33,25 +62,71 @@ def parse_url(url, base=None, encoding="utf-8"):
     :param str url: URL input string
     :param str base: Optional base URL to use while parsing.
     :param encoding: Character encoding to use for parsing the URL, defaults to UTF-8.
+    :param bool frozen: Return an immutable and hashable :class:`FrozenUrl`.
+    :param bool lazy: Stop parsing URLs with an authority once the host and
+        port are parsed. The path, query and fragment are parsed the first
+        time that they're accessed. Validation errors in those components
+        aren't reported while parsing.
+    :param QueryFilter query_filter: Optional filter to apply to the query.
     :rtype: Url
     :raises: UrlParserError
     :return: The parsed URL.
     """
-    parser = UrlParser()
-    return parser.parse(url, base=base, encoding=encoding)
+    if lazy:
+        url = UrlParser(_LazyUrl()).parse(
+            url, base=base, encoding=encoding, query_filter=query_filter
+        )
+    else:
+        parser = _acquire_parser()
+        try:
+            url = parser.parse(
+                url, base=base, encoding=encoding, query_filter=query_filter
+            )
+        finally:
+            _release_parser(parser)
+    if frozen:
+        return url.freeze()
+    return url
+
+
+def parse_origin(url, base=None, encoding="utf-8"):
+    """Parses only as much of a URL as is needed for its origin. Parsing
+    stops after the host and port of URLs with an authority.
+
+    :param str url: URL input string.
+    :param str base: Optional base URL to parse relative to.
+    :param str encoding: Character encoding to parse with. Defaults to UTF-8.
+    :raises: UrlParserError
+    :return: The origin of the URL, see :attr:`Url.origin`.
+    """
+    return UrlParser(_LazyUrl()).parse(url, base=base, encoding=encoding).origin
+
 
+def parse_host_only(url, base=None, encoding="utf-8"):
+    """Parses only as much of a URL as is needed for its host. Parsing
+    stops after the host and port of URLs with an authority.
 
-def normalize_url(url, base=None, encoding="utf-8"):
+    :param str url: URL input string.
+    :param str base: Optional base URL to parse relative to.
+    :param str encoding: Character encoding to parse with. Defaults to UTF-8.
+    :raises: UrlParserError
+    :return: The serialized host of the URL or ``None``.
+    """
+    return UrlParser(_LazyUrl()).parse(url, base=base, encoding=encoding).hostname
+
+
+def normalize_url(url, base=None, encoding="utf-8", query_filter=None):
     """Normalizes a URL input with and optional base URL.
 
     :param str url: URL input to normalize.
     :param str base: Optional base URL to parse relative to.
     :param str encoding: Character encoding to parse with. Defaults to UTF-8.
+    :param QueryFilter query_filter: Optional filter to apply to the query.
     :rtype
     :raises: UrlParserError
     :return: The normalized URL as a string.
     """
-    return parse_url(url, base=base, encoding=encoding).href
+    return parse_url(url, base=base, encoding=encoding, query_filter=query_filter).href
 
 
 def is_valid_url(url, base=None, encoding="utf-8"):
@@ -70,6 +145,462 @@ def is_valid_url(url, base=None, encoding="utf-8"):
         return False
 
 
+def parse_urls(urls, base=None, encoding="utf-8", errors="raise", frozen=False):
+    """Parses a batch of URLs with an optional base URL. The base URL is
+    parsed once, a single parser is used for the whole batch and inputs
+    that appear more than once are only parsed once.
+
+    :param urls: Iterable of URL input strings.
+    :param str base: Optional base URL to parse relative to.
+    :param str encoding: Character encoding to parse with. Defaults to UTF-8.
+    :param str errors: What to do with URLs that fail to parse. ``"raise"``
+        raises the :class:`UrlParserError`, ``"return"`` puts it in the
+        results in place of the URL and ``"skip"`` leaves it out.
+    :param bool frozen: Return immutable and hashable :class:`FrozenUrl`
+        instances. Repeated inputs then share a single instance.
+    :rtype: list
+    :raises: UrlParserError
+    :return: The parsed URLs in the order of the inputs.
+    """
+    if errors not in ("raise", "return", "skip"):
+        raise ValueError("errors must be one of 'raise', 'return' or 'skip'")
+
+    if isinstance(base, six.string_types):
+        base = _parse_base_url(base, encoding)
+
+    parser = UrlParser()
+    parsed = {}
+    results = []
+
+    for url in urls:
+        # bytearray and memoryview inputs are keyed by a copy of their bytes
+        # that can't be mistaken for a Python 2 str input.
+        key = url
+        if isinstance(url, memoryview):
+            key = (memoryview, url.tobytes())
+        elif isinstance(url, bytearray):
+            key = (memoryview, bytes(url))
+
+        result = parsed.get(key)
+        if result is None:
+            try:
+                result = parser.parse(url, base=base, encoding=encoding)
+                if frozen:
+                    result = result.freeze()
+            except UrlParserError as e:
+                if errors == "raise":
+                    raise
+                result = e
+            parsed[key] = result
+
+        # Repeated inputs get their own copy unless the URLs are frozen.
+        elif not frozen and isinstance(result, Url):
+            result = result.thaw()
+
+        if errors == "skip" and isinstance(result, UrlParserError):
+            continue
+        results.append(result)
+
+    return results
+
+
+def parse_urls_async(
+    urls,
+    base=None,
+    encoding="utf-8",
+    errors="raise",
+    frozen=False,
+    slice_size=500,
+    executor=None,
+    loop=None,
+):
+    """Parses a batch of URLs without blocking an asyncio event loop.
+    The URLs are parsed in slices, each one in a separate callback on
+    the event loop so that other tasks run in between, or in an executor
+    if one is given. Takes the same parameters as :func:`parse_urls`.
+
+    :param int slice_size: Number of URLs to parse in each slice.
+    :param executor: Optional :class:`concurrent.futures.Executor` to
+        parse the slices in instead of the event loop.
+    :param loop: Event loop to use. Defaults to the running event loop, so
+        it must be given when called outside of a coroutine or callback.
+    :rtype: asyncio.Future
+    :return: Future with the list of parsed URLs in the order of the inputs.
+    """
+    import asyncio
+
+    if errors not in ("raise", "return", "skip"):
+        raise ValueError("errors must be one of 'raise', 'return' or 'skip'")
+    if slice_size < 1:
+        raise ValueError("slice_size must be at least 1")
+    if loop is None:
+        if hasattr(asyncio, "get_running_loop"):
+            loop = asyncio.get_running_loop()
+        else:  # Python 3.6 and older
+            loop = asyncio.get_event_loop()
+    if isinstance(base, six.string_types):
+        base = _parse_base_url(base, encoding)
+
+    parse_slice = functools.partial(
+        parse_urls, base=base, encoding=encoding, errors=errors, frozen=frozen
+    )
+    future = loop.create_future()
+
+    if executor is not None:
+        slices = [
+            loop.run_in_executor(executor, parse_slice, urls_slice)
+            for urls_slice in _iter_chunks(urls, slice_size)
+        ]
+        if not slices:
+            future.set_result([])
+            return future
+        slices = asyncio.gather(*slices)
+
+        def on_slices_done(slices):
+            if future.cancelled():
+                return
+            elif slices.exception() is not None:
+                future.set_exception(slices.exception())
+            else:
+                future.set_result(
+                    [url for results in slices.result() for url in results]
+                )
+
+        slices.add_done_callback(on_slices_done)
+        return future
+
+    urls = iter(urls)
+    results = []
+
+    def parse_next_slice():
+        if future.cancelled():
+            return
+        urls_slice = list(itertools.islice(urls, slice_size))
+        try:
+            results.extend(parse_slice(urls_slice))
+        except Exception as e:
+            future.set_exception(e)
+            return
+        if len(urls_slice) < slice_size:
+            future.set_result(results)
+        else:
+            loop.call_soon(parse_next_slice)
+
+    loop.call_soon(parse_next_slice)
+    return future
+
+
+def normalize_urls_parallel(
+    urls,
+    workers=None,
+    chunksize=1000,
+    base=None,
+    encoding="utf-8",
+    errors="raise",
+    ordered=True,
+):
+    """Normalizes URLs in a pool of worker processes. Inputs are read
+    from the iterable in chunks as results are consumed, so only a few
+    chunks per worker are in flight at a time. Each worker keeps its
+    base URL and host caches between chunks.
+
+    :param urls: Iterable of URL input strings.
+    :param int workers: Number of worker processes. Defaults to the
+        number of CPUs.
+    :param int chunksize: Number of URLs sent to a worker at a time.
+    :param str base: Optional base URL to parse relative to.
+    :param str encoding: Character encoding to parse with. Defaults to UTF-8.
+    :param str errors: What to do with URLs that fail to parse, see
+        :func:`parse_urls`.
+    :param bool ordered: Yield results in the order of the inputs. If
+        ``False`` the results of each chunk are yielded as soon as
+        that chunk is done.
+    :raises: UrlParserError
+    :return: Generator of normalized URLs as strings.
+    """
+    import multiprocessing
+
+    if errors not in ("raise", "return", "skip"):
+        raise ValueError("errors must be one of 'raise', 'return' or 'skip'")
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+
+    return _iter_normalized_parallel(
+        urls, workers, chunksize, base, encoding, errors, ordered
+    )
+
+
+def _iter_normalized_parallel(
+    urls, workers, chunksize, base, encoding, errors, ordered
+):
+    """Generator behind :func:`normalize_urls_parallel`, which checks its
+    arguments before the first result is requested.
+    """
+    import multiprocessing
+
+    worker_errors = "skip" if errors == "skip" else "return"
+    pool = multiprocessing.Pool(workers)
+    try:
+        pending = collections.deque()
+        chunks = _iter_chunks(urls, chunksize)
+        while True:
+            for chunk in itertools.islice(chunks, 2 * workers - len(pending)):
+                pending.append(
+                    pool.apply_async(
+                        _normalize_chunk, (chunk, base, encoding, worker_errors)
+                    )
+                )
+            if not pending:
+                break
+
+            for href in _pop_chunk_result(pending, ordered):
+                if errors == "raise" and isinstance(href, UrlParserError):
+                    raise href
+                yield href
+    finally:
+        pool.terminate()
+
+
+def _iter_chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _pop_chunk_result(pending, ordered):
+    """Removes the result of the oldest pending chunk, or of any finished
+    chunk if results don't need to be ordered, and returns it.
+    """
+    if not ordered:
+        while True:
+            finished = next((result for result in pending if result.ready()), None)
+            if finished is not None:
+                pending.remove(finished)
+                return finished.get()
+            pending[0].wait(0.001)
+    return pending.popleft().get()
+
+
+def _normalize_chunk(urls, base, encoding, errors):
+    """Normalizes a chunk of URLs in a worker process"""
+    return [
+        url if isinstance(url, UrlParserError) else url.href
+        for url in parse_urls(
+            urls, base=base, encoding=encoding, errors=errors, frozen=True
+        )
+    ]
+
+
+def canonical_hash(
+    url, base=None, encoding="utf-8", lowercase_path=False, sort_query=False, bits=64
+):
+    """Parses a URL and returns its canonical hash for detecting
+    duplicate URLs, see :meth:`Url.canonical_key`.
+
+    :param str url: URL input string.
+    :param str base: Optional base URL to parse relative to.
+    :param str encoding: Character encoding to parse with. Defaults to UTF-8.
+    :param bool lowercase_path: Lowercase the path before hashing.
+    :param bool sort_query: Sort the query parameters by name before hashing.
+    :param int bits: Size of the hash, either 64 or 128.
+    :rtype: int
+    :raises: UrlParserError
+    """
+    return parse_url(url, base=base, encoding=encoding).canonical_key(
+        lowercase_path=lowercase_path, sort_query=sort_query, bits=bits
+    )
+
+
+def set_parser_pooling(enabled):
+    """Enables or disables reusing :class:`UrlParser` instances between
+    calls to :func:`parse_url`, :func:`normalize_url` and :func:`is_valid_url`.
+    Each thread keeps its own pool of parsers. Disabled by default.
+
+    :param bool enabled: Whether parsers should be pooled.
+    """
+    global _parser_pooling
+    _parser_pooling = bool(enabled)
+
+
+_parser_pooling = False
+_parser_pool = threading.local()
+
+
+def _acquire_parser():
+    if _parser_pooling:
+        parsers = getattr(_parser_pool, "parsers", None)
+        if parsers:
+            return parsers.pop()
+    return UrlParser()
+
+
+def _release_parser(parser):
+    if _parser_pooling:
+        # Resetting drops the parser's references to the URL
+        # that was just returned and to the base URL.
+        parser.reset()
+        parsers = getattr(_parser_pool, "parsers", None)
+        if parsers is None:
+            parsers = _parser_pool.parsers = []
+        parsers.append(parser)
+
+
+_CacheInfo = collections.namedtuple(
+    "CacheInfo", ["hits", "misses", "maxsize", "currsize"]
+)
+
+
+class _LruCache(object):
+    """Thread-safe least-recently-used cache with hit and miss counters"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = value
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def resize(self, maxsize):
+        if maxsize < 0:
+            raise ValueError("maxsize can't be negative")
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        with self._lock:
+            return _CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+_base_cache = _LruCache(256)
+
+
+def base_cache_info():
+    """Returns the hits, misses, maximum size and current size of the
+    cache of parsed base URLs used when ``base`` is given as a string.
+
+    :rtype: CacheInfo
+    """
+    return _base_cache.info()
+
+
+def base_cache_clear():
+    """Empties the cache of parsed base URLs and resets its statistics."""
+    _base_cache.clear()
+
+
+def set_base_cache_size(maxsize):
+    """Sets the maximum number of parsed base URLs to cache.
+    A size of 0 disables the cache. Defaults to 256.
+
+    :param int maxsize: Maximum number of base URLs to keep.
+    :raises: ValueError if the size is negative.
+    """
+    _base_cache.resize(maxsize)
+
+
+_host_cache = _LruCache(4096)
+
+
+def host_cache_info():
+    """Returns the hits, misses, maximum size and current size of the
+    cache used by :meth:`UrlParser.parse_host`.
+
+    :rtype: CacheInfo
+    """
+    return _host_cache.info()
+
+
+def host_cache_clear():
+    """Empties the host cache and resets its statistics."""
+    _host_cache.clear()
+
+
+def set_host_cache_size(maxsize):
+    """Sets the maximum number of hosts to cache. A size of 0 disables
+    the cache for memory-constrained processes. Defaults to 4096.
+
+    :param int maxsize: Maximum number of hosts to keep.
+    :raises: ValueError if the size is negative.
+    """
+    _host_cache.resize(maxsize)
+
+
+def percent_encode(string, encode_set):
+    """Percent-encodes a string with the given encode set. Code points
+    in the encode set and code points above U+007E are replaced by the
+    percent-encoded bytes of their UTF-8 encoding.
+
+    :param str string: String to percent-encode.
+    :param set encode_set: Code points to percent-encode, such as
+        :data:`PATH_PERCENT_ENCODE` or :data:`USERINFO_PERCENT_ENCODE`.
+    :rtype: str
+    :return: The percent-encoded string.
+    :raises: TypeError if the string isn't text or a bytes-like object.
+    """
+    table = PERCENT_ENCODE_TABLES.get(frozenset(encode_set))
+    if table is None:
+        table = _ascii_percent_encode_table(encode_set)
+    if not isinstance(string, six.text_type):
+        if not isinstance(string, (bytes, bytearray, memoryview)):
+            raise TypeError(
+                "Expected text or a bytes-like object, not %s"
+                % type(string).__name__
+            )
+        return _percent_encode_bytes(string, table)
+    string = string.translate(table)
+    if NON_ASCII_RUN.search(string) is None:
+        return string
+    return NON_ASCII_RUN.sub(_percent_encode_non_ascii, string)
+
+
+def _parse_base_url(base, encoding):
+    """Parses a base URL given as a string. Parsed base URLs are cached
+    as frozen URLs and shared between parsers.
+    """
+    if _base_cache.maxsize <= 0:
+        return UrlParser().parse(base, encoding=encoding)
+
+    key = (base, encoding)
+    url = _base_cache.get(key)
+    if url is None:
+        url = UrlParser().parse(base, encoding=encoding).freeze()
+        _base_cache.put(key, url)
+    return url
+
+
 class _OpaqueOrigin(tuple):
     def __eq__(self, _):
         return False
@@ -87,7 +618,7 @@ def b(x, encoding="ascii"):
 ASCII_ALPHA = set(string.ascii_letters)
 ASCII_DIGITS = set(string.digits)
 ASCII_ALPHANUMERIC = ASCII_ALPHA | ASCII_DIGITS
-TWO_ASCII_HEX = re.compile(r"^[a-fA-F0-9]{2}")
+TWO_ASCII_HEX = re.compile(r"[a-fA-F0-9]{2}")
 URL_CODEPOINTS = ASCII_ALPHANUMERIC | set("!$&'()*+,-./:;=?@_~")
 SCHEME_CHARS = ASCII_ALPHANUMERIC | set("+-.")
 NONCHARACTERS = {
@@ -176,6 +707,61 @@ C0_PERCENT_ENCODE = set([chr(x) for x in range(0x20)])
 FRAGMENT_PERCENT_ENCODE = set(' "<>`') | C0_PERCENT_ENCODE
 PATH_PERCENT_ENCODE = set("#?{}") | FRAGMENT_PERCENT_ENCODE
 USERINFO_PERCENT_ENCODE = set("/:;=@[\\]^|") | PATH_PERCENT_ENCODE
+QUERY_PERCENT_ENCODE = set(' "#<>') | C0_PERCENT_ENCODE
+SPECIAL_QUERY_PERCENT_ENCODE = set("'") | QUERY_PERCENT_ENCODE
+
+# Inputs of these types are decoded before parsing. On Python 2 'str'
+# is treated as text like it always has been.
+if six.PY3:
+    BINARY_TYPES = (bytes, bytearray, memoryview)
+else:
+    BINARY_TYPES = (bytearray, memoryview)
+
+PERCENT_ENCODED_BYTES = ["%%%02X" % x for x in range(256)]
+NON_ASCII_RUN = re.compile(u"[^\x00-\x7f]+")
+
+
+def _ascii_percent_encode_table(encode_set):
+    """Builds the str.translate() table for the ASCII code points
+    that are percent-encoded with the given encode set.
+    """
+    return dict(
+        (x, six.text_type(PERCENT_ENCODED_BYTES[x]))
+        for x in range(0x80)
+        if x > 0x7e or chr(x) in encode_set
+    )
+
+
+PERCENT_ENCODE_TABLES = dict(
+    (frozenset(encode_set), _ascii_percent_encode_table(encode_set))
+    for encode_set in (
+        C0_PERCENT_ENCODE,
+        FRAGMENT_PERCENT_ENCODE,
+        PATH_PERCENT_ENCODE,
+        USERINFO_PERCENT_ENCODE,
+        QUERY_PERCENT_ENCODE,
+        SPECIAL_QUERY_PERCENT_ENCODE,
+    )
+)
+
+# Code points other than ASCII alphanumerics and "*-._" are percent-encoded
+# by the application/x-www-form-urlencoded serializer and space becomes "+".
+FORM_URLENCODED_TABLE = _ascii_percent_encode_table(
+    set([chr(x) for x in range(0x80)]) - ASCII_ALPHANUMERIC - set("*-._")
+)
+FORM_URLENCODED_TABLE[0x20] = u"+"
+
+QUERY_BYTE_TABLE = [
+    PERCENT_ENCODED_BYTES[x] if x > 0x7e or chr(x) in QUERY_PERCENT_ENCODE else chr(x)
+    for x in range(256)
+]
+SPECIAL_QUERY_BYTE_TABLE = [
+    "%27" if x == 0x27 else QUERY_BYTE_TABLE[x] for x in range(256)
+]
+
+C0_CONTROL_OR_SPACE = "".join([chr(x) for x in range(0x21)])
+ASCII_TAB_OR_NEWLINE = re.compile(r"[\t\n\r]")
+ASCII_TAB_OR_NEWLINE_TABLE = dict.fromkeys([ord(c) for c in "\t\n\r"])
 
 FORBIDDEN_HOST_CODE_POINTS = {
     "\x00",
@@ -194,12 +780,32 @@ FORBIDDEN_HOST_CODE_POINTS = {
     "]",
 }
 
-WINDOWS_DRIVE_LETTER = re.compile(r"^([a-zA-Z][:|])(?:[/\\?#]|$)")
+WINDOWS_DRIVE_LETTER = re.compile(r"([a-zA-Z][:|])(?:[/\\?#]|$)")
 NORMALIZED_WINDOWS_DRIVE_LETTER = re.compile(r"^[a-zA-Z][:]$")
 
 AUTHORITY_DELIMITERS = {"", "/", "?", "#"}
 PATH_DELIMITERS = {"", "/", "\\", "?", "#"}
 
+# Runs of code points that a state appends to its buffer unchanged,
+# matched from the current pointer so a whole run is consumed at once.
+SCHEME_RUN = re.compile(r"[a-zA-Z0-9+\-.]+")
+AUTHORITY_RUN = re.compile(r"[^@/?#\\]+")
+NOT_SPECIAL_AUTHORITY_RUN = re.compile(r"[^@/?#]+")
+HOST_RUN = re.compile(r"[^:\[\]/?#\\]+")
+PORT_RUN = re.compile(r"[0-9]+")
+FILE_HOST_RUN = re.compile(r"[^/?#\\]+")
+
+# Runs of URL code points and valid percent-encoded bytes which the
+# PATH, CANNOT BE BASE URL, QUERY and FRAGMENT states output as-is
+# without raising a validation error or needing to be percent-encoded.
+_SAFE_RUN = r"(?:[a-zA-Z0-9!$&%s()*+,\-.%s:;=@_~]+|%%[a-fA-F0-9]{2})+"
+PATH_RUN = re.compile(_SAFE_RUN % ("'", ""))
+CANNOT_BE_BASE_URL_RUN = re.compile(_SAFE_RUN % ("'", "/"))
+QUERY_RUN = re.compile(_SAFE_RUN % ("'", "/?"))
+SPECIAL_QUERY_RUN = re.compile(_SAFE_RUN % ("", "/?"))
+FRAGMENT_RUN = re.compile(_SAFE_RUN % ("'", "/?"))
+PATH_SEGMENTS_RUN = re.compile(_SAFE_RUN % ("'", "/"))
+
 HEX_CHAR_MAP = dict(
     [
         (b(_x + _y), b(chr(int(_x + _y, 16)), "charmap"))
@@ -208,8 +814,22 @@ HEX_CHAR_MAP = dict(
     ]
 )
 
+HEX_DIGIT_VALUES = dict([(_x, int(_x, 16)) for _x in string.hexdigits])
+
+IPV4_NUMBER_DIGITS = {
+    8: re.compile(r"[0-7]+\Z"),
+    10: re.compile(r"[0-9]+\Z"),
+    16: re.compile(r"[0-9a-fA-F]+\Z"),
+}
+
 IDNA_DOTS_REGEX = re.compile(u"[\u002e\u3002\uff0e\uff61]")
 
+# Hostnames made only of ASCII letters, digits and hyphens which are valid
+# IDNA labels (no leading or trailing hyphen and no hyphens in the 3rd and
+# 4th positions, so no xn-- labels) are only lowercased by IDNA processing.
+_LDH_LABEL = r"(?![a-zA-Z0-9]{2}--)[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?"
+LDH_HOSTNAME = re.compile(r"(?:%s\.)*%s\.?\Z" % (_LDH_LABEL, _LDH_LABEL))
+
 
 SPECIAL_SCHEMES = {
     "ftp": 21,
@@ -254,6 +874,23 @@ class _UrlParserReturn(Exception):
 
 
 class Url(object):
+    # Parsed URLs are often kept around in large numbers so they don't
+    # carry a per-instance __dict__ and the path is stored as a tuple
+    # whenever it isn't being modified by a UrlParser.
+    _fields = (
+        "_scheme",
+        "_hostname",
+        "_port",
+        "_username",
+        "_password",
+        "_query",
+        "_fragment",
+        "_path",
+        "encoding",
+        "cannot_be_base_url",
+    )
+    __slots__ = _fields + ("_search_params",)
+
     def __init__(
         self,
         scheme=None,
@@ -267,9 +904,6 @@ class Url(object):
         cannot_be_base_url=False,
         encoding="utf-8",
     ):
-        if path is None:
-            path = []
-
         self._scheme = scheme
         self._hostname = hostname
         self._port = port
@@ -277,10 +911,11 @@ class Url(object):
         self._password = password
         self._query = query
         self._fragment = fragment
-        self._path = path
+        self._path = () if path is None else tuple(path)
 
         self.encoding = encoding
         self.cannot_be_base_url = cannot_be_base_url
+        self._search_params = None
 
     @property
     def scheme(self):
@@ -342,6 +977,14 @@ class Url(object):
 
     @hostname.setter
     def hostname(self, hostname):
+        # Hostnames with only letters, digits, hyphens and dots contain
+        # no delimiters so the HOSTNAME state would parse them as a whole.
+        if self._scheme != "file" and LDH_HOSTNAME.match(hostname):
+            self._hostname = UrlParser(self).parse_host(
+                hostname, self._scheme not in SPECIAL_SCHEMES
+            )
+            return
+
         parser = UrlParser(self)
         parser.parse(
             hostname, encoding=self.encoding, state_override=PARSER_STATE_HOSTNAME
@@ -349,6 +992,14 @@ class Url(object):
 
     @port.setter
     def port(self, port):
+        if (
+            isinstance(port, six.integer_types)
+            and not isinstance(port, bool)
+            and 0 <= port <= 0xffff
+        ):
+            self._port = None if port == SPECIAL_SCHEMES.get(self._scheme) else port
+            return
+
         parser = UrlParser(self)
         parser.parse(str(port), state_override=PARSER_STATE_PORT)
 
@@ -357,6 +1008,20 @@ class Url(object):
         if self.cannot_be_base_url:
             return
 
+        # Paths without dot segments or code points to percent-encode
+        # are only split into segments by the PATH state.
+        if self._scheme != "file" and _full_match(PATH_SEGMENTS_RUN, path):
+            segments = path.split("/")
+            if path.startswith("/"):
+                del segments[0]
+            if not any(
+                segment in SINGLE_DOT_PATH_SEGMENTS
+                or segment in DOUBLE_DOT_PATH_SEGMENTS
+                for segment in segments
+            ):
+                self._path = tuple(segments)
+                return
+
         self._path = []
         parser = UrlParser(self)
         parser.parse(path, state_override=PARSER_STATE_PATH_START)
@@ -370,6 +1035,15 @@ class Url(object):
         if query.startswith("?"):
             query = query[1:]
 
+        if self.encoding == "utf-8":
+            if self._scheme in SPECIAL_SCHEMES:
+                run = SPECIAL_QUERY_RUN
+            else:
+                run = QUERY_RUN
+            if query == "" or _full_match(run, query):
+                self._query = query
+                return
+
         self._query = ""
         parser = UrlParser(self)
         parser.parse(query, encoding=self.encoding, state_override=PARSER_STATE_QUERY)
@@ -383,12 +1057,30 @@ class Url(object):
         if fragment.startswith("#"):
             fragment = fragment[1:]
 
+        if fragment == "" or _full_match(FRAGMENT_RUN, fragment):
+            self._fragment = fragment
+            return
+
         self._fragment = ""
         parser = UrlParser(self)
         parser.parse(
             fragment, encoding=self.encoding, state_override=PARSER_STATE_FRAGMENT
         )
 
+    @property
+    def search_params(self):
+        """The query as a :class:`UrlSearchParams`. It's parsed the first
+        time that it's accessed after the query changes and modifying it
+        updates the query.
+        """
+        search_params = self._search_params
+        if search_params is None or search_params._query is not self._query:
+            search_params = UrlSearchParams(self._query or "")
+            search_params._url = self
+            search_params._query = self._query
+            self._search_params = search_params
+        return search_params
+
     @property
     def includes_credentials(self):
         """Determines if a URL includes credentials"""
@@ -471,58 +1163,730 @@ class Url(object):
     def __str__(self):
         return self.href
 
+    def canonical_key(self, lowercase_path=False, sort_query=False, bits=64):
+        """Returns a 64 or 128-bit hash of the URL without its fragment for
+        detecting duplicate URLs. The components are fed to the hash one at
+        a time in the order that they appear in the ``href``. The hash is
+        a truncated SHA-1 digest so keys are the same on every Python
+        version and can be stored.
+
+        :param bool lowercase_path: Lowercase the path before hashing.
+        :param bool sort_query: Sort the query parameters by name before
+            hashing, see :class:`QueryFilter`.
+        :param int bits: Size of the hash, either 64 or 128.
+        :rtype: int
+        """
+        if bits != 64 and bits != 128:
+            raise ValueError("bits must be 64 or 128")
+
+        hash_ = hashlib.sha1()
+        update = hash_.update
+
+        update(self._scheme.encode("utf-8") + b":")
+        if self._hostname is not None:
+            update(b"//")
+            if self.includes_credentials:
+                if self._username:
+                    update(self._username.encode("utf-8"))
+                if self._password:
+                    update(b":" + self._password.encode("utf-8"))
+                update(b"@")
+            update(self._hostname.encode("utf-8"))
+            if self._port is not None:
+                update(b":" + str(self._port).encode("ascii"))
+        elif self._scheme == "file":
+            update(b"//")
+
+        if self.cannot_be_base_url:
+            path = self._path[0]
+        elif self._path:
+            path = "/" + "/".join(self._path)
+        else:
+            path = ""
+        if lowercase_path:
+            path = path.lower()
+        update(path.encode("utf-8"))
+
+        query = self._query
+        if query is not None and sort_query:
+            query = _SORT_QUERY_FILTER.filter(query)
+        if query is not None:
+            update(b"?" + query.encode("utf-8"))
+
+        return int(binascii.hexlify(hash_.digest()[: bits // 8]), 16)
+
+    def freeze(self):
+        """Returns an immutable and hashable copy of the URL"""
+        return FrozenUrl._from_url(self)
+
+    def thaw(self):
+        """Returns a mutable copy of the URL"""
+        url = Url.__new__(Url)
+        for name in Url._fields:
+            setattr(url, name, getattr(self, name))
+        url._search_params = None
+        return url
+
+    def __getstate__(self):
+        # Classes with __slots__ need these to be pickled with protocols
+        # older than 2, which is the default on Python 2.
+        return tuple([getattr(self, name) for name in Url._fields])
+
+    def __setstate__(self, state):
+        for i, name in enumerate(Url._fields):
+            setattr(self, name, state[i])
+        self._search_params = None
+
+
+class FrozenUrl(Url):
+    """A :class:`Url` that can't be modified. The ``href`` is serialized
+    once and frozen URLs compare equal and hash by their ``href`` so they
+    can be used as set members and dictionary keys. Frozen URLs can be
+    shared between threads.
+    """
+
+    __slots__ = ("_href",)
+
+    def __init__(self, *args, **kwargs):
+        self._init_from_url(Url(*args, **kwargs))
+
+    @classmethod
+    def _from_url(cls, url):
+        frozen = cls.__new__(cls)
+        frozen._init_from_url(url)
+        return frozen
+
+    def _init_from_url(self, url):
+        for name in Url._fields:
+            object.__setattr__(self, name, getattr(url, name))
+        object.__setattr__(self, "_search_params", None)
+        object.__setattr__(self, "_href", Url.href.fget(self))
+
+    @property
+    def href(self):
+        return self._href
+
+    @property
+    def search_params(self):
+        """A :class:`UrlSearchParams` parsed from the query. Modifying it
+        doesn't change the frozen URL.
+        """
+        return UrlSearchParams(self._query or "")
+
+    def freeze(self):
+        return self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s is immutable" % self.__class__.__name__)
+
+    def __eq__(self, other):
+        if isinstance(other, FrozenUrl):
+            return self._href == other._href
+        return NotImplemented
+
+    def __ne__(self, other):
+        if isinstance(other, FrozenUrl):
+            return self._href != other._href
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._href)
+
+    def __setstate__(self, state):
+        url = Url.__new__(Url)
+        url.__setstate__(state)
+        self._init_from_url(url)
+
+
+class UrlSearchParams(object):
+    """An ordered list of name-value pairs parsed from and serialized to
+    a query with the ``application/x-www-form-urlencoded`` parser and
+    serializer. Instances returned by :attr:`Url.search_params` update
+    the URL's query whenever they're changed.
+
+    :param init: A query string, with or without a leading ``?``, or an
+        iterable of name-value pairs or a dict.
+    """
+
+    def __init__(self, init=""):
+        self._url = None
+        self._query = None
+
+        if isinstance(init, six.string_types):
+            if init.startswith("?"):
+                init = init[1:]
+            self._pairs = _parse_form_urlencoded(init)
+        elif isinstance(init, dict):
+            self._pairs = list(init.items())
+        else:
+            self._pairs = [(name, value) for name, value in init]
+
+    def append(self, name, value):
+        self._sync()
+        self._pairs.append((name, value))
+        self._update()
+
+    def extend(self, pairs):
+        """Appends all of the name-value pairs and updates the query once"""
+        self._sync()
+        self._pairs.extend(pairs)
+        self._update()
+
+    def delete(self, *names):
+        """Removes all pairs with any of the given names"""
+        self._sync()
+        names = set(names)
+        pairs = [pair for pair in self._pairs if pair[0] not in names]
+        if len(pairs) != len(self._pairs):
+            self._pairs = pairs
+            self._update()
+
+    def get(self, name):
+        self._sync()
+        for pair_name, value in self._pairs:
+            if pair_name == name:
+                return value
+        return None
+
+    def get_all(self, name):
+        self._sync()
+        return [value for pair_name, value in self._pairs if pair_name == name]
+
+    def has(self, name):
+        self._sync()
+        return any(pair_name == name for pair_name, _ in self._pairs)
+
+    def set(self, name, value):
+        """Sets the value of the first pair with the given name and removes
+        any others, or appends a new pair if there isn't one.
+        """
+        self._sync()
+        pairs = []
+        found = False
+        for pair in self._pairs:
+            if pair[0] != name:
+                pairs.append(pair)
+            elif not found:
+                pairs.append((name, value))
+                found = True
+        if not found:
+            pairs.append((name, value))
+        self._pairs = pairs
+        self._update()
+
+    def sort(self):
+        """Sorts the pairs by name in UTF-16 code unit order, keeping the
+        relative order of pairs with the same name.
+        """
+        self._sync()
+        pairs = sorted(self._pairs, key=_utf16_sort_key)
+        if pairs != self._pairs:
+            self._pairs = pairs
+            self._update()
+
+    def _sync(self):
+        """Parses the pairs again if the URL's query was replaced since
+        they were last parsed or written.
+        """
+        url = self._url
+        if url is not None and url._query is not self._query:
+            self._query = url._query
+            self._pairs = _parse_form_urlencoded(self._query or "")
+
+    def _update(self):
+        """Writes the serialized pairs back to the URL's query"""
+        if self._url is None:
+            return
+        query = self._serialize() or None
+        self._url._query = query
+        self._query = query
+
+    def __contains__(self, name):
+        return self.has(name)
+
+    def __iter__(self):
+        self._sync()
+        return iter(self._pairs)
+
+    def __len__(self):
+        self._sync()
+        return len(self._pairs)
+
+    def __str__(self):
+        self._sync()
+        return self._serialize()
+
+    def _serialize(self):
+        return "&".join(
+            [
+                _serialize_form_urlencoded(name)
+                + "="
+                + _serialize_form_urlencoded(value)
+                for name, value in self._pairs
+            ]
+        )
+
+    def __repr__(self):
+        self._sync()
+        return "<%s %r>" % (self.__class__.__name__, self._pairs)
+
+
+class QueryFilter(object):
+    """Compiled rules for removing and sorting query parameters while
+    a URL is parsed. Parameters are matched by their decoded name against
+    glob patterns, such as ``"utm_*"`` for a prefix or ``"fbclid"`` for an
+    exact name. Pass it as ``query_filter`` to :func:`parse_url` or
+    :func:`normalize_url`.
+
+    :param allow: Optional patterns of names to keep. Names that don't
+        match any of them are removed, so an empty list removes all
+        parameters.
+    :param deny: Optional patterns of names to remove. An empty list
+        doesn't remove any.
+    :param bool sort: Sort the remaining parameters by name like
+        :meth:`UrlSearchParams.sort` does.
+    """
+
+    def __init__(self, allow=None, deny=None, sort=False):
+        self.allow = _compile_globs(allow)
+        self.deny = _compile_globs(deny)
+        self.sort = sort
+
+    def filter(self, query):
+        """Filters a serialized query. Parameters are kept as they are
+        in the query and only their names are decoded. The query is
+        returned unchanged if no parameters were removed and it isn't
+        sorted. Otherwise the remaining parameters are joined without
+        empty sequences, and ``None`` is returned if none are left.
+        """
+        allow = self.allow
+        deny = self.deny
+        sequences = []
+        names = []
+        removed = False
+
+        for sequence in query.split("&"):
+            if sequence == "":
+                continue
+            name = _form_urlencoded_decode(sequence.partition("=")[0])
+            if (allow is None or allow.match(name)) and (
+                deny is None or not deny.match(name)
+            ):
+                sequences.append(sequence)
+                names.append(name)
+            else:
+                removed = True
+
+        if not removed and (not self.sort or not sequences):
+            return query
+
+        if self.sort:
+            order = sorted(range(len(names)), key=lambda i: _utf16_key(names[i]))
+            sequences = [sequences[i] for i in order]
+
+        if not sequences:
+            return None
+        return "&".join(sequences)
+
+
+MATCH_NOTHING = re.compile(r"(?!)")
+
+
+def _compile_globs(patterns):
+    if patterns is None:
+        return None
+    if isinstance(patterns, six.string_types):
+        patterns = [patterns]
+    if not patterns:
+        # An empty alternation would match every name.
+        return MATCH_NOTHING
+    return re.compile("|".join(["(?:%s)" % fnmatch.translate(x) for x in patterns]))
+
+
+URL_PATTERN_COMPONENTS = ("scheme", "hostname", "port", "pathname", "search", "hash")
+URL_PATTERN_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+URL_PATTERN_LITERAL = re.compile(r"[^*:\\]*\Z")
+URL_PATTERN_SEGMENTS = {"hostname": r"[^.]+", "pathname": r"[^/]+"}
+URL_PATTERN_TEXT = re.compile(r":[A-Za-z_][A-Za-z0-9_]*|\\.|[^:\\]+", re.DOTALL)
+
+
+class UrlPattern(object):
+    """A pattern over the components of a URL similar to the ``URLPattern``
+    API of the URL Pattern standard. Each component is a pattern string
+    where ``*`` matches any sequence of code points, ``:name`` matches
+    a non-empty segment that doesn't contain ``"/"`` in the pathname or ``"."``
+    in the hostname and ``\\`` escapes the next code point. Everything
+    else is matched literally against the serialized component.
+    Components that aren't given match anything. Like the URL they're
+    matched against, the literal text of the scheme and hostname is
+    lowercased and literal hostname labels are encoded with IDNA. The
+    opaque hostnames of non-special URLs are lowercased before they're
+    matched.
+
+    :param str scheme: Pattern for :attr:`Url.scheme`.
+    :param str hostname: Pattern for :attr:`Url.hostname`.
+    :param str port: Pattern for :attr:`Url.port`, empty for the default port.
+    :param str pathname: Pattern for :attr:`Url.path`.
+    :param str search: Pattern for :attr:`Url.query` without the ``"?"``.
+    :param str hash: Pattern for :attr:`Url.fragment` without the ``"#"``.
+    """
+
+    def __init__(
+        self, scheme="*", hostname="*", port="*", pathname="*", search="*", hash="*"
+    ):
+        self.scheme = _lowercase_url_pattern(scheme)
+        self.hostname = _canonicalize_hostname_pattern(hostname)
+        self.port = port
+        self.pathname = pathname
+        self.search = search
+        self.hash = hash
+
+        self._regexes = []
+        for index, component in enumerate(URL_PATTERN_COMPONENTS):
+            pattern = getattr(self, component)
+            if pattern != "*":
+                self._regexes.append((index, _compile_url_pattern(pattern, component)))
+
+    def test(self, url):
+        """Returns ``True`` if the URL matches the pattern"""
+        return self._match_components(_url_pattern_components(url)) is not None
+
+    def match(self, url):
+        """Matches a URL against the pattern. Returns a dictionary of the
+        groups captured by each component, or ``None`` if the URL doesn't
+        match. Groups of ``*`` are named by their position, starting at ``"0"``.
+
+        :param url: A :class:`Url` or a URL string to parse.
+        :rtype: dict
+        """
+        components = _url_pattern_components(url)
+        matches = self._match_components(components)
+        if matches is None:
+            return None
+
+        result = dict((component, {}) for component in URL_PATTERN_COMPONENTS)
+        for index, match in matches:
+            result[URL_PATTERN_COMPONENTS[index]] = dict(
+                (_url_pattern_group_name(name), value)
+                for name, value in match.groupdict().items()
+            )
+        for index, component in enumerate(URL_PATTERN_COMPONENTS):
+            if getattr(self, component) == "*":
+                result[component] = {"0": components[index]}
+        return result
+
+    def _match_components(self, components):
+        matches = []
+        for index, regex in self._regexes:
+            match = regex.match(components[index])
+            if match is None:
+                return None
+            matches.append((index, match))
+        return matches
+
+    def __repr__(self):
+        return "<%s %s>" % (
+            self.__class__.__name__,
+            " ".join(
+                [
+                    "%s=%r" % (component, getattr(self, component))
+                    for component in URL_PATTERN_COMPONENTS
+                    if getattr(self, component) != "*"
+                ]
+            ),
+        )
+
+
+class UrlPatternSet(object):
+    """A compiled set of :class:`UrlPattern` objects that are matched
+    against a URL together. Patterns with a literal hostname such as
+    ``"example.com"`` or a wildcard subdomain such as ``"*.example.com"``
+    are indexed by their labels in reverse order, so only the patterns
+    for the URL's hostname and its parent domains are tried.
+
+    :param patterns: Optional iterable of :class:`UrlPattern` objects.
+    """
+
+    def __init__(self, patterns=()):
+        self._patterns = []
+        self._root = {}
+        self._fallback = []
+        for pattern in patterns:
+            self.add(pattern)
+
+    def add(self, pattern):
+        """Adds a :class:`UrlPattern` to the set"""
+        index = len(self._patterns)
+        self._patterns.append(pattern)
+
+        hostname = pattern.hostname
+        if hostname.startswith("*.") and URL_PATTERN_LITERAL.match(hostname, 2):
+            key = _SUFFIX_PATTERNS
+            hostname = hostname[2:]
+        elif URL_PATTERN_LITERAL.match(hostname):
+            key = _EXACT_PATTERNS
+        else:
+            self._fallback.append(index)
+            return
+
+        node = self._root
+        for label in reversed(hostname.split(".")):
+            node = node.setdefault(label, {})
+        node.setdefault(key, []).append(index)
+
+    def match(self, url):
+        """Returns a list of the patterns that match the URL in the
+        order that they were added.
+
+        :param url: A :class:`Url` or a URL string to parse.
+        :rtype: list
+        """
+        components = _url_pattern_components(url)
+        patterns = self._patterns
+        return [
+            patterns[index]
+            for index in self._candidates(components[1])
+            if patterns[index]._match_components(components) is not None
+        ]
+
+    def test(self, url):
+        """Returns ``True`` if any of the patterns match the URL"""
+        components = _url_pattern_components(url)
+        patterns = self._patterns
+        for index in self._candidates(components[1]):
+            if patterns[index]._match_components(components) is not None:
+                return True
+        return False
+
+    def _candidates(self, hostname):
+        candidates = list(self._fallback)
+        node = self._root
+        labels = hostname.split(".")
+        for remaining in range(len(labels) - 1, -1, -1):
+            node = node.get(labels[remaining])
+            if node is None:
+                break
+            if remaining:
+                candidates.extend(node.get(_SUFFIX_PATTERNS, ()))
+            else:
+                candidates.extend(node.get(_EXACT_PATTERNS, ()))
+        if len(candidates) > len(self._fallback):
+            candidates.sort()
+        return candidates
+
+    def __len__(self):
+        return len(self._patterns)
+
+    def __iter__(self):
+        return iter(self._patterns)
+
+
+_EXACT_PATTERNS = object()
+_SUFFIX_PATTERNS = object()
+
+
+def _compile_url_pattern(pattern, component):
+    segment = URL_PATTERN_SEGMENTS.get(component, r".+")
+    parts = []
+    wildcards = 0
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "*":
+            parts.append("(?P<_%d>.*)" % wildcards)
+            wildcards += 1
+        elif c == ":" and URL_PATTERN_NAME.match(pattern, i + 1):
+            name = URL_PATTERN_NAME.match(pattern, i + 1).group()
+            parts.append("(?P<%s>%s)" % (name, segment))
+            i += len(name)
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        else:
+            parts.append(re.escape(c))
+        i += 1
+
+    try:
+        return re.compile("".join(parts) + r"\Z", re.DOTALL)
+    except re.error as e:
+        six.raise_from(
+            ValueError("Invalid %s pattern %r: %s" % (component, pattern, e)), e
+        )
+
+
+def _lowercase_url_pattern(pattern):
+    # Group names keep their case.
+    return URL_PATTERN_TEXT.sub(_lowercase_url_pattern_text, pattern)
+
+
+def _lowercase_url_pattern_text(match):
+    text = match.group()
+    return text if text.startswith(":") else text.lower()
+
+
+def _canonicalize_hostname_pattern(pattern):
+    labels = pattern.split(".")
+    for i, label in enumerate(labels):
+        if NON_ASCII_RUN.search(label) and URL_PATTERN_LITERAL.match(label):
+            try:
+                labels[i] = _domain_to_ascii(label).decode("utf-8")
+            except (idna.IDNAError, UnicodeError) as e:
+                six.raise_from(
+                    ValueError("Invalid hostname pattern %r: %s" % (pattern, e)), e
+                )
+    return _lowercase_url_pattern(".".join(labels))
+
+
+def _url_pattern_group_name(name):
+    if name.startswith("_") and name[1:].isdigit():
+        return name[1:]
+    return name
+
+
+def _url_pattern_components(url):
+    if not isinstance(url, Url):
+        url = parse_url(url, lazy=True)
+    port = url.port
+    hostname = url.hostname or ""
+    if url.scheme not in SPECIAL_SCHEMES:
+        # Opaque hosts keep their case but patterns are lowercased.
+        hostname = hostname.lower()
+    return (
+        url.scheme,
+        hostname,
+        "" if port is None else str(port),
+        url.path,
+        url.query or "",
+        url.fragment or "",
+    )
+
+
+_SORT_QUERY_FILTER = QueryFilter(sort=True)
+
+
+def _lazy_slot(name):
+    """Wraps a slot of Url so that accessing it on a _LazyUrl
+    parses the rest of the URL first.
+    """
+    slot = getattr(Url, name)
+
+    def fget(self):
+        self._materialize()
+        return slot.__get__(self, Url)
+
+    def fset(self, value):
+        self._materialize()
+        slot.__set__(self, value)
+
+    return property(fget, fset)
+
+
+_URL_PATH_SLOT = Url._path
+_URL_QUERY_SLOT = Url._query
+_URL_FRAGMENT_SLOT = Url._fragment
+
+
+class _LazyUrl(Url):
+    """A :class:`Url` returned by ``parse_url(..., lazy=True)``. The input
+    from the PATH START state onwards is kept and parsed the first time
+    that the path, query or fragment is accessed.
+    """
+
+    __slots__ = ("_tail", "_query_filter")
+
+    _path = _lazy_slot("_path")
+    _query = _lazy_slot("_query")
+    _fragment = _lazy_slot("_fragment")
+
+    def __init__(self, *args, **kwargs):
+        self._tail = None
+        self._query_filter = None
+        super(_LazyUrl, self).__init__(*args, **kwargs)
+
+    def _materialize(self):
+        tail = self._tail
+        if tail is None:
+            return
+
+        # The rest of the URL is parsed into a temporary URL and published
+        # before the tail is cleared, so other threads reading the URL
+        # meanwhile parse it themselves instead of seeing a partial result.
+        # Tails are only deferred at PATH START so the path starts empty
+        # even if another thread already published its own.
+        url = Url(
+            scheme=self._scheme,
+            hostname=self._hostname,
+            port=self._port,
+            username=self._username,
+            password=self._password,
+            cannot_be_base_url=self.cannot_be_base_url,
+            encoding=self.encoding,
+        )
+        parser = UrlParser(url)
+        parser.encoding = self.encoding
+        parser.query_filter = self._query_filter
+        parser._state = PARSER_STATE_PATH_START
+        parser._input = tail
+        url._path = list(url._path)
+        parser._run()
+
+        _URL_PATH_SLOT.__set__(self, url._path)
+        _URL_QUERY_SLOT.__set__(self, url._query)
+        _URL_FRAGMENT_SLOT.__set__(self, url._fragment)
+        self._tail = None
+
+    def __getstate__(self):
+        self._materialize()
+        return super(_LazyUrl, self).__getstate__()
+
+    def __setstate__(self, state):
+        self._tail = None
+        self._query_filter = None
+        super(_LazyUrl, self).__setstate__(state)
+
 
 class UrlParser(object):
     def __init__(self, url=None):
+        # A parser that isn't given a URL to modify can be reused and
+        # parses into a new URL every time that parse() is called.
+        self._owns_url = url is None
         if url is None:
             url = Url()
+        self._lazy = isinstance(url, _LazyUrl)
 
         self.url = url
         self.base = None
         self.state_override = None
+        self.encoding = None
+        self.query_filter = None
         self.validation_error = False
 
         self._state = None
+        self._input = ""
         self._pointer = 0
         self._buffer = ""
+        self._output = []
+        self._tail = None
+        self._query_filtered = False
         self._at_flag = False
         self._square_brace_flag = False
         self._password_token_seen_flag = False
+        self._username_parts = []
+        self._password_parts = []
 
-        self._state_handlers = {
-            PARSER_STATE_SCHEME_START: self._on_scheme_start,
-            PARSER_STATE_SCHEME: self._on_scheme,
-            PARSER_STATE_NO_SCHEME: self._on_no_scheme,
-            PARSER_STATE_SPECIAL_RELATIVE_OR_AUTHORITY: (
-                self._on_special_relative_or_authority
-            ),
-            PARSER_STATE_PATH_OR_AUTHORITY: self._on_path_or_authority,
-            PARSER_STATE_RELATIVE: self._on_relative,
-            PARSER_STATE_RELATIVE_SLASH: self._on_relative_slash,
-            PARSER_STATE_SPECIAL_AUTHORITY_SLASHES: self._on_special_authority_slashes,
-            PARSER_STATE_SPECIAL_AUTHORITY_IGNORE_SLASHES: (
-                self._on_special_authority_ignore_slashes
-            ),
-            PARSER_STATE_AUTHORITY: self._on_authority,
-            PARSER_STATE_HOST: self._on_host_or_hostname,
-            PARSER_STATE_HOSTNAME: self._on_host_or_hostname,
-            PARSER_STATE_PORT: self._on_port,
-            PARSER_STATE_FILE: self._on_file,
-            PARSER_STATE_FILE_SLASH: self._on_file_slash,
-            PARSER_STATE_FILE_HOST: self._on_file_host,
-            PARSER_STATE_PATH_START: self._on_path_start,
-            PARSER_STATE_PATH: self._on_path,
-            PARSER_STATE_CANNOT_BE_BASE_URL: self._on_cannot_be_base_url,
-            PARSER_STATE_QUERY: self._on_query,
-            PARSER_STATE_FRAGMENT: self._on_fragment,
-        }
-
-    def parse(self, data, base=None, encoding=None, state_override=None):
+    def parse(
+        self, data, base=None, encoding=None, state_override=None, query_filter=None
+    ):
         self.reset()
+        self.query_filter = query_filter
 
-        if isinstance(base, str):
-            base_parser = UrlParser()
-            base = base_parser.parse(base, encoding=encoding)
+        if isinstance(base, BINARY_TYPES):
+            base = _decode_input(base, encoding or "utf-8")
+        if isinstance(base, six.string_types):
+            base = _parse_base_url(base, encoding)
         self.base = base
 
         self.state_override = state_override
@@ -535,20 +1899,26 @@ class UrlParser(object):
 
         self.url.encoding = self.encoding
 
-        while data and _is_c0_control_or_space(data[0]):
-            self.validation_error = True
-            data = data[1:]
+        if isinstance(data, BINARY_TYPES):
+            data = _decode_input(data, self.encoding)
 
-        while data and _is_c0_control_or_space(data[-1]):
+        data, validation_error = _preprocess_input(data)
+        if validation_error:
             self.validation_error = True
-            data = data[:-1]
 
-        before_len = len(data)
-        data = data.replace("\t", "").replace("\n", "").replace("\r", "")
+        # State handlers look ahead by indexing into the input
+        # rather than being handed a slice of the remaining data
+        # so that parsing stays linear in the length of the input.
+        self._input = data
+        self.url._path = list(self.url._path)
+        return self._run()
 
-        if len(data) < before_len:
-            self.validation_error = True
+    def _run(self):
+        """Runs the state machine over the input from the current state"""
+        data = self._input
+        state_handlers = self._state_handlers
 
+        # The path is only a list while parsing, even if parsing fails.
         try:
             end_pointer = len(data)
 
@@ -556,34 +1926,95 @@ class UrlParser(object):
                 end_pointer == 0 and self._pointer == 0
             ):
                 if end_pointer > 0:
-                    self._call_state_handler(
-                        self._state, data[self._pointer], data[self._pointer + 1 :]
-                    )
+                    state_handlers[self._state](self, data[self._pointer])
+                    self._pointer += 1
 
                 while self._pointer == end_pointer:
-                    self._call_state_handler(self._state, "", "")
+                    state_handlers[self._state](self, "")
+                    self._pointer += 1
 
         except _UrlParserReturn:
             pass
+        finally:
+            self._flush_output()
+            self.url._path = tuple(self.url._path)
 
+        if (
+            self.query_filter is not None
+            and self._tail is None
+            and not self._query_filtered
+            and self.url._query
+        ):
+            # Queries copied from the base URL don't go through the QUERY state.
+            self.url._query = self.query_filter.filter(self.url._query)
+        if self._tail is not None:
+            self.url._tail = self._tail
+            self.url._query_filter = self.query_filter
         return self.url
 
-    def _call_state_handler(self, state, c, remaining):
-        self._state_handlers[state](c, remaining)
-        self._pointer += 1
+    def _flush_output(self):
+        """Joins the output collected by the CANNOT BE BASE URL, QUERY
+        and FRAGMENT states onto the URL. Output is collected in a list
+        as appending to a string attribute copies it every time.
+        """
+        if not self._output:
+            return
+        output = "".join(self._output)
+        del self._output[:]
+
+        if self._state == PARSER_STATE_QUERY:
+            if self.query_filter is None:
+                self.url._query += output
+            else:
+                self.url._query = self.query_filter.filter(self.url._query + output)
+                self._query_filtered = True
+        elif self._state == PARSER_STATE_FRAGMENT:
+            self.url._fragment += output
+        elif self._state == PARSER_STATE_CANNOT_BE_BASE_URL:
+            self.url._path[0] += output
 
     def parse_host(self, host, is_not_special=False):
+        """Parses and serializes a host. Results, including failures and
+        whether a validation error occurred, are kept in the host cache.
+        """
+        if _host_cache.maxsize <= 0:
+            return self._parse_host(host, is_not_special)
+
+        key = (host, bool(is_not_special))
+        cached = _host_cache.get(key)
+
+        if cached is None:
+            validation_error = self.validation_error
+            self.validation_error = False
+            try:
+                ascii_host = self._parse_host(host, is_not_special)
+            except UrlParserError:
+                ascii_host = None
+            cached = (ascii_host, self.validation_error)
+            self.validation_error = self.validation_error or validation_error
+            _host_cache.put(key, cached)
+
+        ascii_host, validation_error = cached
+        if validation_error:
+            self.validation_error = True
+        if ascii_host is None:
+            raise UrlParserError()
+        return ascii_host
+
+    def _parse_host(self, host, is_not_special):
         # IPv6 parsing
         if host.startswith("["):
             if not host.endswith("]"):
                 self.validation_error = True
                 raise UrlParserError()
 
-            try:
-                return "[%s]" % ipaddress.IPv6Address(host[1:-1])
-            except ipaddress.AddressValueError:
+            address = _parse_ipv6(host[1:-1])
+            if address is None:
+                self.validation_error = True
                 raise UrlParserError()
 
+            return "[%s]" % _serialize_ipv6(address)
+
         # Opaque-host parsing
         if is_not_special:
             codepoints = set(host)
@@ -593,7 +2024,11 @@ class UrlParser(object):
                 self.validation_error = True
                 raise UrlParserError()
 
-            return "".join([_percent_encode(c, C0_PERCENT_ENCODE) for c in host])
+            return percent_encode(host, C0_PERCENT_ENCODE)
+
+        # Plain ASCII hostnames skip percent-decoding and IDNA.
+        if len(host) <= 253 and LDH_HOSTNAME.match(host) is not None:
+            return self.parse_ipv4_host(host.lower())
 
         try:
             domain = _string_percent_decode(host).decode("utf-8")
@@ -618,55 +2053,78 @@ class UrlParser(object):
         a lot of parsing rules for decimal, octal, hex, different
         numbers of separators, etc.
         """
-        parts = ascii_domain.split(".")
-
-        if parts[-1] == "":
+        end = len(ascii_domain)
+        if end == 0 or ascii_domain[-1] == ".":
             self.validation_error = True
-            if len(parts) > 1:
-                parts.pop(-1)
+            if end > 0:
+                end -= 1
 
-        if len(parts) > 4:
+        if ascii_domain.count(".", 0, end) > 3:
             return ascii_domain
 
-        numbers = []
-        for part in parts:
-            if part == "":
+        # Every number but the last one is accumulated into ipv4
+        # as a single byte and the last number fills the rest.
+        ipv4 = 0
+        count = 0
+        last = None
+        last_overflowed = False
+        start = 0
+        while start <= end:
+            stop = ascii_domain.find(".", start, end)
+            if stop == -1:
+                stop = end
+            if start == stop:
                 return ascii_domain
 
-            n, flag = _parse_ipv4_number(part)
-            if n is None:
+            number, _ = _parse_ipv4_number(ascii_domain[start:stop])
+            if number is None:
                 return ascii_domain
 
-            numbers.append(n)
+            if last is not None:
+                last_overflowed = last_overflowed or last > 255
+                ipv4 = (ipv4 << 8) + last
+            last = number
+            count += 1
+            start = stop + 1
 
-        for i, number in enumerate(numbers):
-            if number > 255:
-                self.validation_error = True
-                if i < len(numbers) - 1:
-                    raise UrlParserError()
-
-        if numbers[-1] >= 256 ** (5 - len(numbers)):
+        if last_overflowed:
             self.validation_error = True
             raise UrlParserError()
 
-        ipv4 = numbers.pop(-1)
-        for i, number in enumerate(numbers):
-            ipv4 += number * (256 ** (3 - i))
+        if last > 255:
+            self.validation_error = True
 
-        output = []
-        for _ in range(4):
-            output.insert(0, str(ipv4 % 256))
-            ipv4 //= 256
+        if last >> (8 * (5 - count)):
+            self.validation_error = True
+            raise UrlParserError()
 
-        return ".".join(output)
+        return _serialize_ipv4((ipv4 << (8 * (5 - count))) + last)
 
     def reset(self):
+        """Clears all state left over from a previous call to parse().
+        A parser that wasn't given a URL to modify also starts over
+        with a new URL.
+        """
+        if self._owns_url and self._state is not None:
+            self.url = Url()
+
+        self.base = None
+        self.state_override = None
+        self.encoding = None
+        self.query_filter = None
         self.validation_error = False
+        self._state = None
+        self._input = ""
         self._pointer = 0
         self._buffer = ""
+        self._output = []
+        self._tail = None
+        self._query_filtered = False
         self._at_flag = False
         self._square_brace_flag = False
         self._password_token_seen_flag = False
+        self._username_parts = []
+        self._password_parts = []
 
     def shorten_url_path(self):
         path_len = len(self.url._path)
@@ -680,7 +2138,7 @@ class UrlParser(object):
             return
         self.url._path.pop(-1)
 
-    def _on_scheme_start(self, c, _):
+    def _on_scheme_start(self, c):
         """Handles the START SCHEME state."""
         if c in ASCII_ALPHA:
             self._buffer += c.lower()
@@ -694,10 +2152,12 @@ class UrlParser(object):
             self.validation_error = True
             raise UrlParserError()
 
-    def _on_scheme(self, c, remaining):
+    def _on_scheme(self, c):
         """Handles the SCHEME state."""
         if c in SCHEME_CHARS:
-            self._buffer += c.lower()
+            match = SCHEME_RUN.match(self._input, self._pointer)
+            self._buffer += match.group().lower()
+            self._pointer = match.end() - 1
 
         elif c == ":":
             if self.state_override is not None:
@@ -729,7 +2189,7 @@ class UrlParser(object):
             self._buffer = ""
 
             if self.url.scheme == "file":
-                if not remaining.startswith("//"):
+                if not self._input.startswith("//", self._pointer + 1):
                     self.validation_error = True
                 self._state = PARSER_STATE_FILE
 
@@ -743,7 +2203,7 @@ class UrlParser(object):
             elif self.url.scheme in SPECIAL_SCHEMES:
                 self._state = PARSER_STATE_SPECIAL_AUTHORITY_SLASHES
 
-            elif remaining.startswith("/"):
+            elif self._input.startswith("/", self._pointer + 1):
                 self._state = PARSER_STATE_PATH_OR_AUTHORITY
                 self._pointer += 1
 
@@ -761,7 +2221,7 @@ class UrlParser(object):
             self.validation_error = True
             raise UrlParserError()
 
-    def _on_no_scheme(self, c, _):
+    def _on_no_scheme(self, c):
         """Handles the NO SCHEME state"""
         if self.base is None or (self.base.cannot_be_base_url and c != "#"):
             self.validation_error = True
@@ -769,7 +2229,7 @@ class UrlParser(object):
 
         elif self.base.cannot_be_base_url and c == "#":
             self.url._scheme = self.base.scheme
-            self.url._path = self.base._path[:]
+            self.url._path = list(self.base._path)
             self.url._query = self.base.query
             self.url._fragment = ""
             self.url.cannot_be_base_url = True
@@ -783,9 +2243,9 @@ class UrlParser(object):
             self._state = PARSER_STATE_FILE
             self._pointer -= 1
 
-    def _on_special_relative_or_authority(self, c, remaining):
+    def _on_special_relative_or_authority(self, c):
         """Handles the SPECIAL RELATIVE OR AUTHORITY state"""
-        if c == "/" and remaining.startswith("/"):
+        if c == "/" and self._input.startswith("/", self._pointer + 1):
             self._state = PARSER_STATE_SPECIAL_AUTHORITY_IGNORE_SLASHES
             self._pointer += 1
 
@@ -794,7 +2254,7 @@ class UrlParser(object):
             self._state = PARSER_STATE_RELATIVE
             self._pointer -= 1
 
-    def _on_path_or_authority(self, c, _):
+    def _on_path_or_authority(self, c):
         """Handles the PATH OR AUTHORITY state"""
         if c == "/":
             self._state = PARSER_STATE_AUTHORITY
@@ -802,7 +2262,7 @@ class UrlParser(object):
             self._state = PARSER_STATE_PATH
             self._pointer -= 1
 
-    def _on_relative(self, c, _):
+    def _on_relative(self, c):
         """Handles the RELATIVE state"""
         self.url._scheme = self.base.scheme
 
@@ -811,7 +2271,7 @@ class UrlParser(object):
             self.url._password = self.base.password
             self.url._hostname = self.base.hostname
             self.url._port = self.base.port
-            self.url._path = self.base._path[:]
+            self.url._path = list(self.base._path)
             self.url._query = self.base.query
 
         elif c == "/":
@@ -822,7 +2282,7 @@ class UrlParser(object):
             self.url._password = self.base.password
             self.url._hostname = self.base.hostname
             self.url._port = self.base.port
-            self.url._path = self.base._path[:]
+            self.url._path = list(self.base._path)
             self.url._query = ""
 
             self._state = PARSER_STATE_QUERY
@@ -832,7 +2292,7 @@ class UrlParser(object):
             self.url._password = self.base.password
             self.url._hostname = self.base.hostname
             self.url._port = self.base.port
-            self.url._path = self.base._path[:]
+            self.url._path = list(self.base._path)
             self.url._query = self.base.query
             self.url._fragment = ""
 
@@ -848,7 +2308,7 @@ class UrlParser(object):
                 self.url._password = self.base.password
                 self.url._hostname = self.base.hostname
                 self.url._port = self.base.port
-                self.url._path = self.base._path[:]
+                self.url._path = list(self.base._path)
 
                 if len(self.url._path):
                     self.url._path.pop(-1)
@@ -856,7 +2316,7 @@ class UrlParser(object):
                 self._state = PARSER_STATE_PATH
                 self._pointer -= 1
 
-    def _on_relative_slash(self, c, _):
+    def _on_relative_slash(self, c):
         if self.url.scheme in SPECIAL_SCHEMES and (c == "/" or c == "\\"):
             if c == "\\":
                 self.validation_error = True
@@ -874,9 +2334,9 @@ class UrlParser(object):
             self._pointer -= 1
             self._state = PARSER_STATE_PATH
 
-    def _on_special_authority_slashes(self, c, remaining):
+    def _on_special_authority_slashes(self, c):
         """Handles the SPECIAL AUTHORITY SLASHES state"""
-        if c == "/" and remaining.startswith("/"):
+        if c == "/" and self._input.startswith("/", self._pointer + 1):
             self._state = PARSER_STATE_SPECIAL_AUTHORITY_IGNORE_SLASHES
             self._pointer += 1
 
@@ -885,7 +2345,7 @@ class UrlParser(object):
             self._state = PARSER_STATE_SPECIAL_AUTHORITY_IGNORE_SLASHES
             self._pointer -= 1
 
-    def _on_special_authority_ignore_slashes(self, c, _):
+    def _on_special_authority_ignore_slashes(self, c):
         """Handles the SPECIAL AUTHORITY IGNORE SLASHES state"""
         if c != "/" and c != "\\":
             self._state = PARSER_STATE_AUTHORITY
@@ -894,7 +2354,7 @@ class UrlParser(object):
         else:
             self.validation_error = True
 
-    def _on_authority(self, c, _):
+    def _on_authority(self, c):
         """Handles the AUTHORITY state"""
         if c == "@":
             self.validation_error = True
@@ -904,19 +2364,19 @@ class UrlParser(object):
 
             self._at_flag = True
 
-            for char in self._buffer:
-                if not self._password_token_seen_flag and char == ":":
+            password = self._buffer
+            if not self._password_token_seen_flag:
+                username, colon, password = password.partition(":")
+                if colon:
                     self._password_token_seen_flag = True
-                    continue
-
-                if self._password_token_seen_flag:
-                    if self.url.password is None:
-                        self.url._password = ""
-                    self.url._password += _percent_encode(char, USERINFO_PERCENT_ENCODE)
-                else:
-                    if self.url.username is None:
-                        self.url._username = ""
-                    self.url._username += _percent_encode(char, USERINFO_PERCENT_ENCODE)
+                if username:
+                    self._username_parts.append(
+                        percent_encode(username, USERINFO_PERCENT_ENCODE)
+                    )
+            if password:
+                self._password_parts.append(
+                    percent_encode(password, USERINFO_PERCENT_ENCODE)
+                )
 
             self._buffer = ""
 
@@ -927,14 +2387,35 @@ class UrlParser(object):
                 self.validation_error = True
                 raise UrlParserError()
 
+            # Every "@" adds to the username or password, which are only
+            # joined once so that many of them don't copy the userinfo.
+            if self._username_parts:
+                self.url._username = (self.url.username or "") + "".join(
+                    self._username_parts
+                )
+                del self._username_parts[:]
+            if self._password_parts:
+                self.url._password = (self.url.password or "") + "".join(
+                    self._password_parts
+                )
+                del self._password_parts[:]
+
             self._pointer -= len(self._buffer) + 1
             self._buffer = ""
             self._state = PARSER_STATE_HOST
 
         else:
-            self._buffer += c
+            if self.url.scheme in SPECIAL_SCHEMES:
+                match = AUTHORITY_RUN.match(self._input, self._pointer)
+            else:
+                match = NOT_SPECIAL_AUTHORITY_RUN.match(self._input, self._pointer)
+            if match is None:
+                self._buffer += c
+            else:
+                self._buffer += match.group()
+                self._pointer = match.end() - 1
 
-    def _on_host_or_hostname(self, c, _):
+    def _on_host_or_hostname(self, c):
         """Handles the HOST and HOSTNAME states"""
         if self.state_override is not None and self.url.scheme == "file":
             self._pointer -= 1
@@ -982,16 +2463,40 @@ class UrlParser(object):
                 raise _UrlParserReturn()
 
         else:
-            if c == "[":
-                self._square_brace_flag = True
-            elif c == "]":
-                self._square_brace_flag = False
-            self._buffer += c
+            # Consume everything up to the next code point that ends the
+            # host, including brackets and the colons between them, and
+            # append it to the buffer at once.
+            data = self._input
+            start = pointer = self._pointer
+            square_brace_flag = self._square_brace_flag
+            is_special = self.url.scheme in SPECIAL_SCHEMES
+            while True:
+                match = HOST_RUN.match(data, pointer)
+                if match is not None:
+                    pointer = match.end()
+                if pointer == len(data):
+                    break
+                c = data[pointer]
+                if c == "[":
+                    square_brace_flag = True
+                elif c == "]":
+                    square_brace_flag = False
+                elif not (
+                    (c == ":" and square_brace_flag) or (c == "\\" and not is_special)
+                ):
+                    break
+                pointer += 1
 
-    def _on_port(self, c, _):
+            self._square_brace_flag = square_brace_flag
+            self._buffer += data[start:pointer]
+            self._pointer = pointer - 1
+
+    def _on_port(self, c):
         """Handles the PORT state"""
         if c in ASCII_DIGITS:
-            self._buffer += c
+            match = PORT_RUN.match(self._input, self._pointer)
+            self._buffer += match.group()
+            self._pointer = match.end() - 1
 
         elif (
             c in PATH_DELIMITERS
@@ -1023,7 +2528,7 @@ class UrlParser(object):
             self.validation_error = True
             raise UrlParserError()
 
-    def _on_file(self, c, remaining):
+    def _on_file(self, c):
         """Handles the FILE state"""
         self.url._scheme = "file"
 
@@ -1035,29 +2540,29 @@ class UrlParser(object):
         elif self.base is not None and self.base.scheme == "file":
             if c == "":
                 self.url._hostname = self.base.hostname
-                self.url._path = self.base._path[:]
+                self.url._path = list(self.base._path)
                 self.url._query = self.base.query
 
             elif c == "?":
                 self.url._hostname = self.base.hostname
-                self.url._path = self.base._path[:]
+                self.url._path = list(self.base._path)
                 self.url._query = ""
 
                 self._state = PARSER_STATE_QUERY
 
             elif c == "#":
                 self.url._hostname = self.base.hostname
-                self.url._path = self.base._path[:]
+                self.url._path = list(self.base._path)
                 self.url._query = self.base.query
                 self.url._fragment = ""
 
                 self._state = PARSER_STATE_FRAGMENT
 
             else:
-                match = WINDOWS_DRIVE_LETTER.search(c + remaining)
+                match = WINDOWS_DRIVE_LETTER.match(self._input, self._pointer)
                 if match is None:
                     self.url._hostname = self.base.hostname
-                    self.url._path = self.base._path[:]
+                    self.url._path = list(self.base._path)
                     self.shorten_url_path()
 
                 else:
@@ -1070,7 +2575,7 @@ class UrlParser(object):
             self._state = PARSER_STATE_PATH
             self._pointer -= 1
 
-    def _on_file_slash(self, c, remaining):
+    def _on_file_slash(self, c):
         """Handles the FILE SLASH state"""
         if c == "/" or c == "\\":
             if c == "\\":
@@ -1081,7 +2586,7 @@ class UrlParser(object):
             if (
                 self.base is not None
                 and self.base.scheme == "file"
-                and WINDOWS_DRIVE_LETTER.search(c + remaining) is None
+                and WINDOWS_DRIVE_LETTER.match(self._input, self._pointer) is None
             ):
                 if (
                     len(self.base._path) > 0
@@ -1096,7 +2601,7 @@ class UrlParser(object):
             self._state = PARSER_STATE_PATH
             self._pointer -= 1
 
-    def _on_file_host(self, c, _):
+    def _on_file_host(self, c):
         """Handles the FILE HOST state"""
         if c in PATH_DELIMITERS:
             self._pointer -= 1
@@ -1131,10 +2636,16 @@ class UrlParser(object):
                 self._state = PARSER_STATE_PATH_START
 
         else:
-            self._buffer += c
+            match = FILE_HOST_RUN.match(self._input, self._pointer)
+            self._buffer += match.group()
+            self._pointer = match.end() - 1
 
-    def _on_path_start(self, c, _):
+    def _on_path_start(self, c):
         """Handles the PATH START state"""
+        if self._lazy and self.state_override is None and self.url.scheme != "file":
+            self._tail = self._input[self._pointer :]
+            raise _UrlParserReturn()
+
         if self.url.scheme in SPECIAL_SCHEMES:
             if c == "\\":
                 self.validation_error = True
@@ -1158,7 +2669,7 @@ class UrlParser(object):
             if c != "/":
                 self._pointer -= 1
 
-    def _on_path(self, c, remaining):
+    def _on_path(self, c):
         """Handles the PATH state"""
         cond = c == "\\" and self.url.scheme in SPECIAL_SCHEMES
         if (
@@ -1170,6 +2681,10 @@ class UrlParser(object):
             if cond:
                 self.validation_error = True
 
+            if self._output:
+                self._buffer += "".join(self._output)
+                del self._output[:]
+
             if self._buffer in DOUBLE_DOT_PATH_SEGMENTS:
                 self.shorten_url_path()
 
@@ -1209,33 +2724,52 @@ class UrlParser(object):
                 self._state = PARSER_STATE_FRAGMENT
 
         else:
+            match = PATH_RUN.match(self._input, self._pointer)
+            if match is not None:
+                self._output.append(match.group())
+                self._pointer = match.end() - 1
+                return
+
             if c != "%" and not _is_url_codepoint(c):
                 self.validation_error = True
-            if c == "%" and TWO_ASCII_HEX.search(remaining) is None:
+            if (
+                c == "%"
+                and TWO_ASCII_HEX.match(self._input, self._pointer + 1) is None
+            ):
                 self.validation_error = True
-            self._buffer += _percent_encode(c, PATH_PERCENT_ENCODE)
+            self._output.append(_percent_encode(c, PATH_PERCENT_ENCODE))
 
-    def _on_cannot_be_base_url(self, c, remaining):
+    def _on_cannot_be_base_url(self, c):
         """Handles the CANNOT BE BASE URL state"""
         if c == "?":
+            self._flush_output()
             self.url._query = ""
             self._state = PARSER_STATE_QUERY
 
         elif c == "#":
+            self._flush_output()
             self.url._fragment = ""
             self._state = PARSER_STATE_FRAGMENT
 
-        else:
-            if c != "" and c != "%" and not _is_url_codepoint(c):
+        elif c != "":
+            match = CANNOT_BE_BASE_URL_RUN.match(self._input, self._pointer)
+            if match is not None:
+                self._output.append(match.group())
+                self._pointer = match.end() - 1
+                return
+
+            if c != "%" and not _is_url_codepoint(c):
                 self.validation_error = True
 
-            if c == "%" and TWO_ASCII_HEX.search(remaining) is None:
+            if (
+                c == "%"
+                and TWO_ASCII_HEX.match(self._input, self._pointer + 1) is None
+            ):
                 self.validation_error = True
 
-            if c != "":
-                self.url._path[0] += _percent_encode(c, C0_PERCENT_ENCODE)
+            self._output.append(_percent_encode(c, C0_PERCENT_ENCODE))
 
-    def _on_query(self, c, remaining):
+    def _on_query(self, c):
         """Handles the QUERY state"""
         if self.encoding != "utf-8" and (
             self.url.scheme == "ws"
@@ -1245,38 +2779,45 @@ class UrlParser(object):
             self.encoding = "utf-8"
 
         if self.state_override is None and c == "#":
+            self._flush_output()
             self.url._fragment = ""
             self._state = PARSER_STATE_FRAGMENT
 
         elif c != "":
+            if self.encoding == "utf-8":
+                if self.url.scheme in SPECIAL_SCHEMES:
+                    match = SPECIAL_QUERY_RUN.match(self._input, self._pointer)
+                else:
+                    match = QUERY_RUN.match(self._input, self._pointer)
+                if match is not None:
+                    self._output.append(match.group())
+                    self._pointer = match.end() - 1
+                    return
+
             if c != "%" and not _is_url_codepoint(c):
                 self.validation_error = True
 
-            if c == "%" and TWO_ASCII_HEX.search(remaining) is None:
+            if (
+                c == "%"
+                and TWO_ASCII_HEX.match(self._input, self._pointer + 1) is None
+            ):
                 self.validation_error = True
 
             bytes_ = c.encode(self.encoding)
 
             if bytes_.startswith(b"&#") and bytes_.endswith(b";"):
-                self.url._query += (b"%26%23" + bytes_[2:-1] + b"%3B").decode("ascii")
+                self._output.append(
+                    (b"%26%23" + bytes_[2:-1] + b"%3B").decode("ascii")
+                )
 
             else:
-                is_special = self.url.scheme in SPECIAL_SCHEMES
-                for byte in _iterbytes(bytes_):
-                    if (
-                        byte < 0x21
-                        or byte > 0x7e
-                        or byte == 0x22
-                        or byte == 0x23
-                        or byte == 0x3c
-                        or byte == 0x3e
-                        or (is_special and byte == 0x27)
-                    ):
-                        self.url._query += "%" + _hex(byte)
-                    else:
-                        self.url._query += chr(byte)
-
-    def _on_fragment(self, c, remaining):
+                if self.url.scheme in SPECIAL_SCHEMES:
+                    table = SPECIAL_QUERY_BYTE_TABLE
+                else:
+                    table = QUERY_BYTE_TABLE
+                self._output.append("".join([table[x] for x in bytearray(bytes_)]))
+
+    def _on_fragment(self, c):
         if c == "":
             pass
 
@@ -1284,13 +2825,51 @@ class UrlParser(object):
             self.validation_error = True
 
         else:
+            match = FRAGMENT_RUN.match(self._input, self._pointer)
+            if match is not None:
+                # Same as the checks below for each code point in the run.
+                self.validation_error = True
+                self._output.append(match.group())
+                self._pointer = match.end() - 1
+                return
+
             if c != "%" and _is_url_codepoint(c):
                 self.validation_error = True
 
-            if c == "%" and TWO_ASCII_HEX.search(remaining) is None:
+            if (
+                c == "%"
+                and TWO_ASCII_HEX.match(self._input, self._pointer + 1) is None
+            ):
                 self.validation_error = True
 
-            self.url._fragment += _percent_encode(c, FRAGMENT_PERCENT_ENCODE)
+            self._output.append(_percent_encode(c, FRAGMENT_PERCENT_ENCODE))
+
+    # Unbound state handlers indexed by their PARSER_STATE_* value. This is
+    # built once here rather than every time that a parser is created.
+    _state_handlers = (
+        None,
+        _on_scheme_start,
+        _on_scheme,
+        _on_no_scheme,
+        _on_special_relative_or_authority,
+        _on_path_or_authority,
+        _on_relative,
+        _on_relative_slash,
+        _on_special_authority_slashes,
+        _on_special_authority_ignore_slashes,
+        _on_authority,
+        _on_host_or_hostname,
+        _on_host_or_hostname,
+        _on_port,
+        _on_file,
+        _on_file_slash,
+        _on_file_host,
+        _on_path_start,
+        _on_path,
+        _on_cannot_be_base_url,
+        _on_query,
+        _on_fragment,
+    )
 
 
 def _string_percent_decode(data):
@@ -1302,10 +2881,27 @@ def _percent_encode(c, encode_set):
     if c in encode_set or ord(c) > 0x7e:
         if not isinstance(c, bytes):
             c = c.encode("utf-8")
-        return "".join(["%" + _hex(x) for x in _iterbytes(c)])
+        return "".join([PERCENT_ENCODED_BYTES[x] for x in bytearray(c)])
     return c
 
 
+def _percent_encode_bytes(data, table):
+    # Python 2 str.translate() doesn't accept dict tables so byte
+    # strings are encoded one byte at a time instead.
+    return "".join(
+        [
+            table.get(x, chr(x)) if x < 0x80 else PERCENT_ENCODED_BYTES[x]
+            for x in bytearray(data)
+        ]
+    )
+
+
+def _percent_encode_non_ascii(match):
+    return "".join(
+        [PERCENT_ENCODED_BYTES[x] for x in bytearray(match.group().encode("utf-8"))]
+    )
+
+
 def _is_url_codepoint(c):
     if c in URL_CODEPOINTS:
         return True
@@ -1318,34 +2914,96 @@ def _is_url_codepoint(c):
     )
 
 
-def _is_c0_control_or_space(c):
-    return c == " " or 0 <= ord(c) <= 0x1f
+def _decode_input(data, encoding):
+    """Decodes a bytes-like input in a single step without copying it
+    to bytes first.
+    """
+    try:
+        if six.PY2:
+            # Python 2 can't decode bytearray or memoryview objects.
+            if isinstance(data, memoryview):
+                data = data.tobytes()
+            return str(data).decode(encoding)
+        return six.text_type(data, encoding)
+    except UnicodeDecodeError as e:
+        six.raise_from(UrlParserError(), e)
+
+
+def _parse_form_urlencoded(query):
+    """Parses a query into a list of name-value pairs"""
+    pairs = []
+    for sequence in query.split("&"):
+        if sequence == "":
+            continue
+        name, _, value = sequence.partition("=")
+        pairs.append((_form_urlencoded_decode(name), _form_urlencoded_decode(value)))
+    return pairs
 
 
-def _percent_decode(bytes_):
-    output = []
-    skip = 0
+def _form_urlencoded_decode(data):
+    data = data.replace("+", " ")
+    if "%" not in data:
+        return data
+    return _string_percent_decode(data).decode("utf-8", "replace")
 
-    def is_hex(x):
-        x = _byte2int(x)
-        return 0x30 <= x <= 0x39 or 0x41 <= x <= 0x46 or 0x61 <= x <= 0x66
 
-    for i, byte in enumerate(_iterbytes(bytes_)):
-        if skip:
-            skip -= 1
-            continue
-        if byte != 0x25:
-            output.append(_int2byte(byte))
-        elif (
-            i + 2 >= len(bytes_)
-            or not is_hex(bytes_[i + 1])
-            or not is_hex(bytes_[i + 2])
-        ):
-            output.append(_int2byte(byte))
+def _serialize_form_urlencoded(data):
+    if isinstance(data, bytes):
+        return _percent_encode_bytes(data, FORM_URLENCODED_TABLE)
+    if not isinstance(data, six.text_type):
+        data = six.text_type(data)
+    data = data.translate(FORM_URLENCODED_TABLE)
+    if NON_ASCII_RUN.search(data) is None:
+        return data
+    return NON_ASCII_RUN.sub(_percent_encode_non_ascii, data)
+
+
+def _utf16_sort_key(pair):
+    return _utf16_key(pair[0])
+
+
+def _utf16_key(name):
+    return name.encode("utf-16-be")
+
+
+def _full_match(regex, string):
+    match = regex.match(string)
+    return match is not None and match.end() == len(string)
+
+
+def _preprocess_input(data):
+    """Removes leading and trailing C0 control or space code points and
+    all ASCII tab or newline code points from an input. Returns the input
+    and whether anything was removed. Clean inputs aren't copied.
+    """
+    stripped = data.strip(C0_CONTROL_OR_SPACE)
+    validation_error = len(stripped) != len(data)
+    if ASCII_TAB_OR_NEWLINE.search(stripped) is not None:
+        validation_error = True
+        if isinstance(stripped, six.text_type):
+            stripped = stripped.translate(ASCII_TAB_OR_NEWLINE_TABLE)
         else:
-            value = int(bytes_[i + 1 : i + 3].decode("ascii").lower(), 16)
-            skip = 2
-            output.append(_int2byte(value))
+            # Python 2 str.translate() doesn't accept dict tables.
+            stripped = ASCII_TAB_OR_NEWLINE.sub("", stripped)
+    return stripped, validation_error
+
+
+def _percent_decode(bytes_):
+    if b"%" not in bytes_:
+        return bytes_
+
+    # Every chunk after a '%' starts with the two hex digits
+    # of a percent-encoded byte unless the '%' is left as-is.
+    chunks = bytes_.split(b"%")
+    output = [chunks[0]]
+    for chunk in chunks[1:]:
+        byte = HEX_CHAR_MAP.get(chunk[:2])
+        if byte is None:
+            output.append(b"%")
+            output.append(chunk)
+        else:
+            output.append(byte)
+            output.append(chunk[2:])
 
     return b"".join(output)
 
@@ -1400,23 +3058,172 @@ def _parse_ipv4_number(input_):
 
     r = 10
 
-    try:
-        if len(input_) >= 2:
-            if input_[:2].lower() == "0x":
-                r = 16
-                input_ = input_[2:]
+    if len(input_) >= 2:
+        if input_[:2].lower() == "0x":
+            r = 16
+            input_ = input_[2:]
 
-            elif input_.startswith("0"):
-                r = 8
-                input_ = input_[1:]
+        elif input_.startswith("0"):
+            r = 8
+            input_ = input_[1:]
 
-        if input_ == "":
-            return 0, False
+    if input_ == "":
+        return 0, False
 
-        return int(input_, r), r != 10
-    except ValueError:
+    # int() also accepts signs, whitespace, underscores
+    # and prefixes which aren't valid radix-R digits.
+    if IPV4_NUMBER_DIGITS[r].match(input_) is None:
         return None, False
 
+    return int(input_, r), r != 10
+
+
+def _serialize_ipv4(address):
+    return "%d.%d.%d.%d" % (
+        address >> 24,
+        address >> 16 & 0xff,
+        address >> 8 & 0xff,
+        address & 0xff,
+    )
+
+
+def _parse_ipv6(input_):
+    """Parses an IPv6 address without the surrounding brackets into a list
+    of eight 16-bit pieces in a single pass. Returns None on failure.
+    """
+    address = [0] * 8
+    piece_index = 0
+    compress = None
+    pointer = 0
+    end = len(input_)
+
+    if input_.startswith(":"):
+        if not input_.startswith("::"):
+            return None
+        pointer += 2
+        piece_index += 1
+        compress = piece_index
+
+    while pointer < end:
+        if piece_index == 8:
+            return None
+
+        c = input_[pointer]
+        if c == ":":
+            if compress is not None:
+                return None
+            pointer += 1
+            piece_index += 1
+            compress = piece_index
+            continue
+
+        value = 0
+        length = 0
+        while length < 4 and pointer < end:
+            digit = HEX_DIGIT_VALUES.get(input_[pointer])
+            if digit is None:
+                break
+            value = (value << 4) + digit
+            pointer += 1
+            length += 1
+
+        c = input_[pointer] if pointer < end else ""
+        if c == ".":
+            if length == 0 or piece_index > 6:
+                return None
+            pointer -= length
+            if not _parse_ipv6_ipv4_pieces(input_, pointer, address, piece_index):
+                return None
+            piece_index += 2
+            break
+
+        elif c == ":":
+            pointer += 1
+            if pointer == end:
+                return None
+
+        elif c != "":
+            return None
+
+        address[piece_index] = value
+        piece_index += 1
+
+    if compress is not None:
+        swaps = piece_index - compress
+        piece_index = 7
+        while piece_index != 0 and swaps > 0:
+            address[piece_index], address[compress + swaps - 1] = (
+                address[compress + swaps - 1],
+                address[piece_index],
+            )
+            piece_index -= 1
+            swaps -= 1
+
+    elif piece_index != 8:
+        return None
+
+    return address
+
+
+def _parse_ipv6_ipv4_pieces(input_, pointer, address, piece_index):
+    """Parses the IPv4 address at the end of an IPv6 address
+    into two pieces. Returns False on failure.
+    """
+    end = len(input_)
+    numbers_seen = 0
+    while pointer < end:
+        if numbers_seen > 0:
+            if input_[pointer] == "." and numbers_seen < 4:
+                pointer += 1
+            else:
+                return False
+
+        ipv4_piece = None
+        while pointer < end and input_[pointer] in ASCII_DIGITS:
+            if ipv4_piece == 0:
+                return False
+            ipv4_piece = (ipv4_piece or 0) * 10 + ord(input_[pointer]) - 0x30
+            if ipv4_piece > 255:
+                return False
+            pointer += 1
+        if ipv4_piece is None:
+            return False
+
+        address[piece_index] = (address[piece_index] << 8) + ipv4_piece
+        numbers_seen += 1
+        if numbers_seen == 2:
+            piece_index += 1
+
+    return numbers_seen == 4
+
+
+def _serialize_ipv6(address):
+    """Serializes eight 16-bit pieces, compressing the first longest run
+    of two or more zero pieces into '::'.
+    """
+    compress = None
+    longest = 1
+    index = 0
+    while index < 8:
+        if address[index] == 0:
+            run_end = index + 1
+            while run_end < 8 and address[run_end] == 0:
+                run_end += 1
+            if run_end - index > longest:
+                compress = index
+                longest = run_end - index
+            index = run_end
+        else:
+            index += 1
+
+    if compress is None:
+        return ":".join(["%x" % piece for piece in address])
+
+    return "%s::%s" % (
+        ":".join(["%x" % piece for piece in address[:compress]]),
+        ":".join(["%x" % piece for piece in address[compress + longest :]]),
+    )
+
 
 class ParseResultMixin(object):
     def geturl(self):
@@ -1491,30 +3298,150 @@ def urljoin(base, url, allow_fragments=True, encoding="utf-8"):
 
 def _add_url_fragment_to_path(url):
     if len(url._path):
-        url._path[-1] += "#" + url.fragment
+        url._path = url._path[:-1] + (url._path[-1] + "#" + url.fragment,)
     else:
-        url._path.append("#" + url.fragment)
+        url._path = ("#" + url.fragment,)
     url.fragment = None
 
 
-def _iterbytes(bytes_):
-    if six.PY3:
-        return bytes_
-    else:
-        return [ord(x) for x in bytes_]
-
-
-def _byte2int(byte):
-    if not isinstance(byte, int):
-        return ord(byte)
-    return byte
-
+def main(argv=None):
+    """Normalizes URLs read line by line from files or standard input
+    and writes them to standard output. Used by ``python -m whatwg_url``.
+    """
+    import argparse
+    import json
 
-def _int2byte(i):
-    if six.PY3:
-        return i.to_bytes(length=1, byteorder="little")
-    return chr(i)
+    parser = argparse.ArgumentParser(
+        prog="python -m whatwg_url",
+        description="Normalizes URLs read one per line from files or stdin.",
+    )
+    parser.add_argument(
+        "files", nargs="*", default=["-"], help="files to read, '-' for stdin"
+    )
+    parser.add_argument("--base", help="base URL to parse relative URLs against")
+    parser.add_argument(
+        "--encoding", default="utf-8", help="character encoding to parse with"
+    )
+    parser.add_argument(
+        "--errors",
+        choices=("raise", "return", "skip"),
+        default="raise",
+        help=(
+            "what to do with URLs that fail to parse: stop with an error, "
+            "write an empty line or skip them (default: raise)"
+        ),
+    )
+    parser.add_argument(
+        "--json",
+        action="store_true",
+        help="write a JSON object with all components for each URL",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="normalize URLs in this many worker processes",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="report the number of URLs and throughput to stderr",
+    )
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error("--workers can't be negative")
+    if args.json and args.workers:
+        parser.error("--json can't be combined with --workers")
+    base = None
+    if args.base is not None:
+        try:
+            base = _parse_base_url(args.base, args.encoding)
+        except UrlParserError:
+            parser.error("invalid --base URL")
+
+    lines = _iter_lines(args.files)
+    if args.workers:
+        results = normalize_urls_parallel(
+            lines,
+            workers=args.workers,
+            base=args.base,
+            encoding=args.encoding,
+            errors="return",
+        )
+    else:
+        results = _iter_parsed_lines(lines, base, args.encoding)
+
+    start = time.time()
+    count = 0
+    failures = 0
+    for count, result in enumerate(results, 1):
+        if isinstance(result, UrlParserError):
+            failures += 1
+            if args.errors == "raise":
+                sys.stderr.write("Failed to parse the URL on line %d\n" % count)
+                return 1
+            elif args.errors == "skip":
+                continue
+            elif args.json:
+                result = json.dumps({"error": "Failed to parse the URL"})
+            else:
+                result = ""
+        elif args.json:
+            result = json.dumps(_url_to_dict(result), sort_keys=True)
+        elif not args.workers:
+            result = result.href
+        sys.stdout.write(result + "\n")
+
+    if args.stats:
+        seconds = time.time() - start
+        sys.stderr.write(
+            "%d URLs, %d failed, %.2f s, %.0f URLs/s\n"
+            % (count, failures, seconds, count / seconds if seconds else 0)
+        )
+    return 0
 
 
-def _hex(x):
-    return hex(_byte2int(x))[2:].zfill(2).upper()
+def _iter_lines(files):
+    """Reads lines as bytes so that they're decoded with the encoding
+    the URLs are parsed with and decoding errors fail a single line.
+    """
+    for path in files:
+        if path == "-":
+            lines = getattr(sys.stdin, "buffer", sys.stdin)
+        else:
+            lines = io.open(path, "rb")
+        try:
+            for line in lines:
+                line = line.rstrip(b"\r\n")
+                # bytes is str on Python 2 and would be parsed as text.
+                yield bytearray(line) if six.PY2 else line
+        finally:
+            if path != "-":
+                lines.close()
+
+
+def _iter_parsed_lines(lines, base, encoding):
+    """Parses lines in chunks with parse_urls() so that memory stays
+    bounded no matter how many lines there are.
+    """
+    for chunk in _iter_chunks(lines, 1000):
+        for url in parse_urls(chunk, base=base, encoding=encoding, errors="return"):
+            yield url
+
+
+def _url_to_dict(url):
+    return {
+        "href": url.href,
+        "scheme": url.scheme,
+        "username": url.username,
+        "password": url.password,
+        "hostname": url.hostname,
+        "port": url.port,
+        "path": url.path,
+        "query": url.query,
+        "fragment": url.fragment,
+    }
+
+
+if __name__ == "__main__":
+    sys.exit(main())